@@ -0,0 +1,5 @@
+import os
+import tempfile
+
+# Paths resolves the game data folder at import time, which only exists on Windows installs
+os.environ.setdefault("LOCALAPPDATA", tempfile.gettempdir())
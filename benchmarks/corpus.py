@@ -0,0 +1,195 @@
+import os
+import random
+import argparse
+from typing import Dict, List
+import benchmarks  # noqa: F401
+from utils.file_manager import FileManager
+from utils.lspk import LSPKWriter
+
+BOOST_VOCABULARY = [f"ActionResource(SpellSlot,{amount},{level})" for amount in range(1, 5) for level in range(1, 10)] + \
+    [f"ActionResource({resource},{amount},0)" for resource in ("Rage", "KiPoint", "SorceryPoint") for amount in range(1, 4)] + \
+    [f"Proficiency(Weapon{index})" for index in range(20)] + [f"Ability(Attribute{index},1)" for index in range(6)]
+PASSIVE_VOCABULARY = [f"Passive_{index}" for index in range(200)]
+CLASS_NAMES = ["Barbarian", "Bard", "Cleric", "Druid", "Fighter", "Monk", "Paladin", "Ranger", "Rogue", "Sorcerer", "Warlock", "Wizard"]
+MAX_LEVEL = 12
+
+MODSETTINGS = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<save>\n'
+    '  <version major="4" minor="7" revision="1" build="3"/>\n'
+    '  <region id="ModuleSettings">\n'
+    '    <node id="root">\n'
+    '      <children>\n'
+    '        <node id="ModOrder">\n'
+    '          <children>\n'
+    '{modules}'
+    '          </children>\n'
+    '        </node>\n'
+    '        <node id="Mods">\n'
+    '          <children>\n'
+    '{short_descs}'
+    '          </children>\n'
+    '        </node>\n'
+    '      </children>\n'
+    '    </node>\n'
+    '  </region>\n'
+    '</save>\n'
+)
+
+
+def progression_node(uuid: str, name: str, table_uuid: str, level: int, rng: random.Random, boosts: int, subclasses: int) -> str:
+    boost_values = ';'.join(rng.choice(BOOST_VOCABULARY) for _ in range(boosts))
+    passive_values = ';'.join(rng.choice(PASSIVE_VOCABULARY) for _ in range(boosts))
+    subclass_nodes = ''.join(
+        f'<node id="SubClass"><attribute id="Object" type="guid" value="subclass-{rng.randrange(subclasses * 50 + 1)}"/></node>'
+        for _ in range(subclasses))
+    return (
+        '<node id="Progression">'
+        f'<attribute id="UUID" type="guid" value="{uuid}"/>'
+        f'<attribute id="Name" type="LSString" value="{name}"/>'
+        f'<attribute id="TableUUID" type="guid" value="{table_uuid}"/>'
+        f'<attribute id="Level" type="uint8" value="{level}"/>'
+        f'<attribute id="Boosts" type="LSString" value="{boost_values}"/>'
+        f'<attribute id="PassivesAdded" type="LSString" value="{passive_values}"/>'
+        '<attribute id="AllowImprovement" type="bool" value="true"/>'
+        f'<children><node id="SubClasses"><children>{subclass_nodes}</children></node></children>'
+        '</node>')
+
+
+def progressions_xml(nodes: List[str]) -> bytes:
+    return ('<?xml version="1.0" encoding="UTF-8"?><save><version major="4" minor="0" revision="9" build="330"/>'
+            '<region id="Progressions"><node id="root"><children>'
+            f'{"".join(nodes)}</children></node></region></save>').encode('utf-8')
+
+
+def synthetic_progressions_xml(count: int, tokens_per_list: int = 6, seed: int = 0) -> bytes:
+    rng = random.Random(seed)
+    return progressions_xml([
+        progression_node(f"progression-{index}", CLASS_NAMES[index % len(CLASS_NAMES)], f"table-{index % len(CLASS_NAMES)}",
+                         index % MAX_LEVEL + 1, rng, tokens_per_list, 2)
+        for index in range(count)])
+
+
+def meta_xml(name: str, uuid: str) -> bytes:
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?><save><version major="4" minor="0" revision="8" build="612"/>'
+        '<region id="Config"><node id="root"><children><node id="Dependencies"/><node id="ModuleInfo">'
+        '<attribute id="Author" type="LSString" value="benchmark"/>'
+        f'<attribute id="Description" type="LSString" value="Synthetic mod {name}"/>'
+        f'<attribute id="Folder" type="LSString" value="{name}"/>'
+        f'<attribute id="Name" type="LSString" value="{name}"/>'
+        f'<attribute id="UUID" type="FixedString" value="{uuid}"/>'
+        '</node></children></node></region></save>').encode('utf-8')
+
+
+def class_descriptions_xml(name: str, subclasses: int, rng: random.Random) -> bytes:
+    nodes = ''.join(
+        '<node id="ClassDescription">'
+        f'<attribute id="Name" type="FixedString" value="{name}Subclass{index}"/>'
+        f'<attribute id="UUID" type="guid" value="{name}-class-{index}"/>'
+        f'<attribute id="ParentGuid" type="guid" value="class-{rng.choice(CLASS_NAMES)}"/>'
+        '</node>' for index in range(subclasses))
+    return ('<?xml version="1.0" encoding="UTF-8"?><save><region id="ClassDescriptions"><node id="root"><children>'
+            f'{nodes}</children></node></region></save>').encode('utf-8')
+
+
+# Builds the {virtual_path: content} files of one synthetic mod
+def mod_files(index: int, progressions: int, subclasses: int, boosts: int, shared_ratio: float, seed: int = 0) -> Dict[str, bytes]:
+    rng = random.Random(seed * 1000003 + index)
+    name = f"BenchmarkMod{index:04d}"
+    nodes = []
+    for position in range(progressions):
+        class_name = rng.choice(CLASS_NAMES)
+        level = rng.randint(1, MAX_LEVEL)
+        if rng.random() < shared_ratio:
+            # Shared progressions are the ones several mods edit and the merge has to combine
+            uuid = f"progression-{class_name}-{level}"
+        else:
+            uuid = f"progression-{name}-{position}"
+        nodes.append(progression_node(uuid, class_name, f"table-{class_name}", level, rng, boosts, subclasses))
+
+    return {
+        f"Mods/{name}/meta.lsx": meta_xml(name, f"benchmark-mod-{index:04d}"),
+        f"Public/{name}/ClassDescriptions/ClassDescriptions.lsx": class_descriptions_xml(name, subclasses, rng),
+        f"Public/{name}/Progressions/Progressions.lsx": progressions_xml(nodes),
+        # Icon files are named loosely on purpose so icon matching has to go past the exact lookup
+        **{f"Public/{name}/Assets/ClassIcons/{name}_subclass_{position}.DDS": bytes(256) for position in range(subclasses)},
+    }
+
+
+def class_icons_xaml() -> str:
+    triggers = ''.join(
+        f'<DataTrigger Binding="{{Binding {binding}IDString}}" Value="{class_name}">'
+        f'<Setter Property="Source" Value="pack://application:,,,/GustavNoesisGUI;component/Assets/ClassIcons/{class_name}.png"/>'
+        '</DataTrigger>\n' for binding in ("", "Subclass") for class_name in CLASS_NAMES)
+    return (
+        '<ResourceDictionary xmlns="http://schemas.microsoft.com/winfx/2006/xaml/presentation" '
+        'xmlns:x="http://schemas.microsoft.com/winfx/2006/xaml">\n'
+        '<Style x:Key="ClassIcon"><Style.Triggers>\n'
+        f'{triggers}'
+        '</Style.Triggers></Style>\n'
+        '</ResourceDictionary>\n')
+
+
+def modsettings_lsx(mod_count: int) -> str:
+    modules = ''.join(
+        '            <node id="Module">\n'
+        f'              <attribute id="UUID" value="benchmark-mod-{index:04d}" type="FixedString"/>\n'
+        '            </node>\n' for index in range(mod_count))
+    short_descs = ''.join(
+        '            <node id="ModuleShortDesc">\n'
+        f'              <attribute id="Folder" value="BenchmarkMod{index:04d}" type="LSString"/>\n'
+        f'              <attribute id="UUID" value="benchmark-mod-{index:04d}" type="FixedString"/>\n'
+        '            </node>\n' for index in range(mod_count))
+    return MODSETTINGS.format(modules=modules, short_descs=short_descs)
+
+
+# Writes N synthetic mods as .pak files and unpacked folders, plus the modsettings.lsx and ImprovedUI files they need
+def generate_corpus(root: str, mods: int, progressions: int = 20, subclasses: int = 2, boosts: int = 4,
+                    shared_ratio: float = 0.5, seed: int = 0, paks: bool = True, folders: bool = True) -> Dict[str, str]:
+    layout = {
+        "root": root,
+        # Same layout as %LOCALAPPDATA%/Larian Studios/Baldur's Gate 3
+        "game_data_dir": os.path.join(root, "game"),
+        "mods_dir": os.path.join(root, "game", "Mods"),
+        "unpacked_dir": os.path.join(root, "unpacked"),
+        "modsettings_file": os.path.join(root, "game", "PlayerProfiles", "Public", "modsettings.lsx"),
+        "class_icons_file": os.path.join(root, "unpacked", "ImprovedUI Assets", "Public", "Game", "GUI", "Library", "IUI_ClassIcons.xaml"),
+    }
+    FileManager.create_folder(layout["mods_dir"])
+
+    for index in range(mods):
+        files = mod_files(index, progressions, subclasses, boosts, shared_ratio, seed)
+        name = f"BenchmarkMod{index:04d}"
+        if paks:
+            LSPKWriter.write_package(os.path.join(layout["mods_dir"], f"{name}.pak"), files)
+        if folders:
+            for virtual_path, content in files.items():
+                file_path = os.path.join(layout["unpacked_dir"], name, *virtual_path.split('/'))
+                FileManager.create_folder(os.path.dirname(file_path))
+                with open(file_path, 'wb') as f:
+                    f.write(content)
+
+    FileManager.write_chunks(layout["modsettings_file"], [modsettings_lsx(mods)])
+    FileManager.write_chunks(layout["class_icons_file"], [class_icons_xaml()])
+    return layout
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic BG3 mod corpus")
+    parser.add_argument("root", help="Folder to write the corpus to")
+    parser.add_argument("--mods", type=int, default=100)
+    parser.add_argument("--progressions", type=int, default=20, help="Progressions per mod")
+    parser.add_argument("--subclasses", type=int, default=2, help="Subclasses per progression")
+    parser.add_argument("--boosts", type=int, default=4, help="Boosts and passives per progression")
+    parser.add_argument("--shared-ratio", type=float, default=0.5, help="Share of progressions that edit common UUIDs")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    layout = generate_corpus(args.root, args.mods, args.progressions, args.subclasses, args.boosts, args.shared_ratio, args.seed)
+    for name, path in layout.items():
+        print(f"{name}: {path}")
+
+
+if __name__ == '__main__':
+    main()
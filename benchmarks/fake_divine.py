@@ -0,0 +1,84 @@
+import os
+import sys
+import fnmatch
+import argparse
+import benchmarks  # noqa: F401
+from utils.lspk import LSPKReader, LSPKWriter
+
+# Stand-in for divine.exe that accepts the same arguments as LSLib.execute_command and uses the native LSPK code
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def extract_package(source_path: str, destination_path: str, args: argparse.Namespace = None) -> None:
+    with LSPKReader(source_path) as reader:
+        for name in reader.entries:
+            file_path = os.path.join(destination_path, *name.split('/'))
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            with open(file_path, 'wb') as f:
+                f.write(reader.read(name))
+
+
+# Like divine, keeps going after a package fails and reports the failures on stderr with a non-zero exit code
+def extract_packages(source_path: str, destination_path: str, args: argparse.Namespace) -> None:
+    failures = 0
+    for file_name in sorted(os.listdir(source_path)):
+        if not fnmatch.fnmatch(file_name, args.package_pattern):
+            continue
+        package_destination = os.path.join(destination_path, os.path.splitext(file_name)[0]) if args.use_package_name else destination_path
+        try:
+            extract_package(os.path.join(source_path, file_name), package_destination)
+        except Exception as e:
+            failures += 1
+            print(f"Failed to extract {file_name}: {e}", file=sys.stderr)
+    if failures:
+        sys.exit(1)
+
+
+def create_package(source_path: str, destination_path: str, args: argparse.Namespace = None) -> None:
+    with LSPKWriter(destination_path) as writer:
+        for folder, _, file_names in os.walk(source_path):
+            for file_name in sorted(file_names):
+                file_path = os.path.join(folder, file_name)
+                with open(file_path, 'rb') as f:
+                    writer.add_file(os.path.relpath(file_path, source_path).replace(os.sep, '/'), f.read())
+
+
+ACTIONS = {
+    "extract-package": extract_package,
+    "extract-packages": extract_packages,
+    "create-package": create_package,
+}
+
+
+# Writes a launcher for the fake divine to the folder and returns its path, to be used as Paths.DIVINE_FILE
+def install(folder: str) -> str:
+    os.makedirs(folder, exist_ok=True)
+    if os.name == 'nt':
+        launcher_path = os.path.join(folder, "divine.cmd")
+        content = f'@set PYTHONPATH={REPO_DIR}\r\n@"{sys.executable}" -m benchmarks.fake_divine %*\r\n'
+    else:
+        launcher_path = os.path.join(folder, "divine")
+        content = f'#!/bin/sh\nPYTHONPATH="{REPO_DIR}" exec "{sys.executable}" -m benchmarks.fake_divine "$@"\n'
+    with open(launcher_path, 'w', newline='') as f:
+        f.write(content)
+    os.chmod(launcher_path, 0o755)
+    return launcher_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake divine.exe for benchmarks")
+    parser.add_argument("-g", "--game")
+    parser.add_argument("-a", "--action", required=True, choices=ACTIONS)
+    parser.add_argument("-c", "--compression-method")
+    parser.add_argument("-s", "--source", required=True)
+    parser.add_argument("-d", "--destination", required=True)
+    parser.add_argument("-l", "--loglevel")
+    parser.add_argument("--use-package-name", action="store_true")
+    parser.add_argument("--package-pattern", default="*.pak")
+    args = parser.parse_args()
+
+    ACTIONS[args.action](args.source, args.destination, args)
+
+
+if __name__ == '__main__':
+    main()
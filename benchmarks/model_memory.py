@@ -0,0 +1,89 @@
+import gc
+import json
+import argparse
+import tracemalloc
+from typing import Callable, List
+import benchmarks  # noqa: F401
+from benchmarks.corpus import synthetic_progressions_xml
+from model.mod import Mod
+
+
+class LegacySubClass:
+    def __init__(self, uuid: str, name: str = None):
+        self.uuid = uuid
+        self.name = "Subclass Name" if name is None else name
+
+
+class LegacyProgression:
+    def __init__(self, uuid, name, table_uuid, level, allow_improvement=None, is_multiclass=None,
+                 boosts=None, passives_added=None, passives_removed=None, selectors=None, subclasses=None):
+        self.uuid = uuid
+        self.name = name
+        self.table_uuid = table_uuid
+        self.level = level
+        self.allow_improvement = allow_improvement
+        self.is_multiclass = is_multiclass
+        self.boosts = boosts or []
+        self.passives_added = passives_added or []
+        self.passives_removed = passives_removed or []
+        self.selectors = selectors or []
+        self.subclasses = subclasses or []
+
+
+def load_current_models(xml: bytes) -> List:
+    mod = Mod()
+    mod.load_progressions_from_string(xml)
+    return mod.progressions
+
+
+def load_legacy_models(xml: bytes) -> List:
+    # Same parsing as the current loader, stored the way the models did before __slots__ and interning
+    progressions = []
+    for progression in load_current_models(xml):
+        progressions.append(LegacyProgression(
+            ''.join(progression.uuid), ''.join(progression.name), ''.join(progression.table_uuid), progression.level,
+            progression.allow_improvement, progression.is_multiclass,
+            ';'.join(progression.boosts).split(';'), ';'.join(progression.passives_added).split(';'), [], [],
+            [LegacySubClass(''.join(subclass.uuid)) for subclass in progression.subclasses]))
+    return progressions
+
+
+def retained_memory(loader: Callable[[bytes], List], xml: bytes) -> int:
+    gc.collect()
+    tracemalloc.start()
+    models = loader(xml)
+    gc.collect()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del models
+    return retained
+
+
+def run(progressions: int) -> dict:
+    xml = synthetic_progressions_xml(progressions)
+    # The legacy loader builds the current models first, so measure it by what it keeps alive
+    legacy = retained_memory(load_legacy_models, xml)
+    current = retained_memory(load_current_models, xml)
+    return {
+        "progressions": progressions,
+        "legacy_bytes": legacy,
+        "current_bytes": current,
+        "ratio": round(current / legacy, 3) if legacy else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the memory retained by the Progression models")
+    parser.add_argument("--progressions", type=int, default=20000)
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    results = run(args.progressions)
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
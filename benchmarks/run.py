@@ -0,0 +1,157 @@
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import platform
+import argparse
+import tempfile
+import itertools
+import statistics
+from typing import Callable, Dict, List
+import benchmarks  # noqa: F401
+from benchmarks import fake_divine
+from benchmarks.corpus import generate_corpus
+from utils.settings_manager import Paths
+from utils.mod_manager import ModManager
+from utils.model_cache import ModelCache
+from utils.merge_state import MergeState
+from utils.conflict_index import ConflictIndex
+
+
+# Points every path the patcher uses at the corpus so a run never touches a real game install
+def configure_paths(layout: Dict[str, str]) -> None:
+    root = layout["root"]
+    Paths.GAME_DATA_DIR = layout["game_data_dir"]
+    Paths.MOD_LIST_DIR = layout["mods_dir"]
+    Paths.TEMP_DIR = os.path.join(root, "temp")
+    Paths.OUTPUT_DIR = os.path.join(root, "output")
+    Paths.CONFLICT_REPORT_FILE = os.path.join(Paths.OUTPUT_DIR, "conflicts.json")
+    Paths.CACHE_DIR = os.path.join(root, "cache")
+    Paths.EXTRACTION_CACHE_DIR = os.path.join(Paths.CACHE_DIR, "extraction")
+    Paths.PATCH_STATE_FILE = os.path.join(Paths.CACHE_DIR, "patch_state.json")
+    Paths.MERGE_STATE_FILE = os.path.join(Paths.CACHE_DIR, "merge_state.json")
+    Paths.MODEL_CACHE_FILE = os.path.join(Paths.CACHE_DIR, "models.pickle")
+    Paths.DIVINE_FILE = fake_divine.install(os.path.join(root, "divine"))
+
+
+# Times func over several runs, calling setup before each one outside of the measured time
+def measure(func: Callable, setup: Callable = None, repeat: int = 3) -> dict:
+    timings = []
+    for _ in range(repeat):
+        argument = setup() if setup is not None else None
+        start = time.perf_counter()
+        func(argument)
+        timings.append(time.perf_counter() - start)
+    return {
+        "repeat": repeat,
+        "min": round(min(timings), 6),
+        "median": round(statistics.median(timings), 6),
+        "mean": round(statistics.mean(timings), 6),
+    }
+
+
+def run_size(root: str, mod_count: int, args: argparse.Namespace) -> Dict[str, dict]:
+    layout = generate_corpus(root, mod_count, args.progressions, args.subclasses, args.boosts, args.shared_ratio, args.seed)
+    configure_paths(layout)
+    unpacked_mods = sorted(
+        os.path.join(layout["unpacked_dir"], folder) for folder in os.listdir(layout["unpacked_dir"]) if folder != "ImprovedUI Assets")
+    mod_files = {unpacked_mod: ModManager.read_unpacked_mod(unpacked_mod) for unpacked_mod in unpacked_mods}
+    patch_data = ModManager.combine_mods(ModManager.load_mods(mod_files))
+    model_cache = ModelCache()
+    ModManager.load_mods(mod_files, model_cache)
+    model_cache.save()
+
+    # Warms the merge state, the incremental stages then measure a run with no or one changed mod
+    ModManager.combine_mods(ModManager.load_mods(mod_files, model_cache), MergeState())
+    changes = itertools.count()
+
+    def change_one_mod():
+        mods = ModManager.load_mods(mod_files, model_cache)
+        change = next(changes)
+        mods[0].fingerprint = f"changed-{change}"
+        mods[0].progressions[0].boosts.append(f"Proficiency(Changed{change})")
+        return mods
+
+    with open(layout["modsettings_file"], 'rb') as f:
+        modsettings = f.read()
+
+    def reset_modsettings(_=None):
+        with open(layout["modsettings_file"], 'wb') as f:
+            f.write(modsettings)
+        if os.path.exists(Paths.PATCH_STATE_FILE):
+            os.remove(Paths.PATCH_STATE_FILE)
+
+    icon_mods = ModManager.load_mods(mod_files)
+    for mod in icon_mods:
+        mod.load_icons()
+        ModManager.load_icons(mod, mod.unpacked_mod_folder)
+    class_icons_file = os.path.join(Paths.TEMP_DIR, "ImprovedUI Assets", "Public", "Game", "GUI", "Library", "IUI_ClassIcons.xaml")
+
+    def reset_class_icons(_=None):
+        os.makedirs(os.path.dirname(class_icons_file), exist_ok=True)
+        shutil.copyfile(layout["class_icons_file"], class_icons_file)
+        ModManager.ImprovedUI_Assets = True
+
+    stages = {
+        "read_mods": (lambda _: ModManager.read_mods(), None),
+        "get_mods_list": (lambda _: ModManager.get_mods_list(unpacked_mods), None),
+        "get_mods_list_cached": (lambda _: ModManager.get_mods_list(unpacked_mods, ModelCache()), None),
+        "combine_mods": (ModManager.combine_mods, lambda: ModManager.load_mods(mod_files)),
+        "combine_mods_incremental": (lambda mods: ModManager.combine_mods(mods, MergeState()), lambda: ModManager.load_mods(mod_files, model_cache)),
+        "combine_mods_incremental_changed": (lambda mods: ModManager.combine_mods(mods, MergeState()), change_one_mod),
+        "combine_mods_conflicts": (lambda mods: ModManager.combine_mods(mods, conflict_index=ConflictIndex()).progressions,
+                                   lambda: ModManager.load_mods(mod_files)),
+        "progressions_string": (lambda _: patch_data.progressions_string(), None),
+        "install_patch": (lambda _: ModManager.install_patch(patch_data), reset_modsettings),
+        "combine_icons": (lambda _: ModManager.combine_icons(icon_mods), reset_class_icons),
+    }
+    if args.divine:
+        stages["unpack_mods"] = (lambda _: ModManager.unpack_mods(), None)
+        stages["unpack_mods_batched"] = (lambda _: ModManager.unpack_mods(batch=True), None)
+
+    results = {}
+    for stage, (func, setup) in stages.items():
+        results[stage] = measure(func, setup, args.repeat)
+        print(f"{mod_count} mods - {stage}: {results[stage]['median']:.4f}s")
+    return results
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Benchmark the patcher stages on synthetic mod corpora")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000], help="Numbers of mods to benchmark")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--progressions", type=int, default=20, help="Progressions per mod")
+    parser.add_argument("--subclasses", type=int, default=2, help="Subclasses per progression")
+    parser.add_argument("--boosts", type=int, default=4, help="Boosts and passives per progression")
+    parser.add_argument("--shared-ratio", type=float, default=0.5, help="Share of progressions that edit common UUIDs")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--divine", action="store_true", help="Also benchmark unpack_mods through the fake divine")
+    parser.add_argument("--label", default="current", help="Name of this run in the results file")
+    parser.add_argument("--output", default="benchmark_results.json", help="JSON file to write the results to")
+    args = parser.parse_args(argv)
+
+    # Only errors from the patcher are logged so they don't drown the stage timings
+    logging.basicConfig(level=logging.ERROR)
+
+    results = {}
+    for mod_count in args.sizes:
+        with tempfile.TemporaryDirectory(prefix="bg3_benchmark_") as root:
+            results[str(mod_count)] = run_size(root, mod_count, args)
+
+    report = {
+        "label": args.label,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "parameters": {key: value for key, value in vars(args).items() if key not in ("label", "output")},
+        "results": results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,23 +1,74 @@
+import os
 import logging
+import argparse
+from contextlib import nullcontext
 
 from utils.debug import setup_logger
 from utils.mod_manager import ModManager
+from utils.extraction_cache import ExtractionCache
+from utils.merge_state import MergeState
+from utils.conflict_index import ConflictIndex
+from utils.model_cache import ModelCache
+from utils.mod_index import ModIndex
+from utils.settings_manager import Paths
+from utils.profiler import profiler
+from utils.file_system import MemoryFileSystem
+from utils.watcher import ModWatcher
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="BG3ModPatcher")
+    parser.add_argument("--log-level", default="DEBUG", choices=["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"],
+                        help="Minimum level of the messages shown and written to the logs")
+    parser.add_argument("--in-memory", action="store_true",
+                        help="Keep extracted and generated files in memory instead of the temp folder")
+    parser.add_argument("--watch", action="store_true",
+                        help="Keep running and update the patch whenever the Mods folder or modsettings.lsx change")
+    parser.add_argument("--index", action="store_true",
+                        help="Update the SQLite index of the installed mods, queried with python -m utils.mod_index")
+    parser.add_argument("--profile", nargs="?", const=os.path.join(Paths.OUTPUT_DIR, "profile.json"), metavar="PATH",
+                        help="Record per-stage timings, memory and counters and write them to PATH (and PATH.folded)")
+    return parser.parse_args()
 
 
 def main():
-    info_level = "DEBUG"
+    args = parse_args()
+    info_level = args.log_level
     setup_logger(info_level)
+    if args.profile:
+        profiler.enable()
     logging.info("Starting BG3ModPatcher v2.0.1 by fierrof")
     mod_manager = ModManager()
-    unpacked_mods = mod_manager.unpack_mods()
-    mods_list = mod_manager.get_mods_list(unpacked_mods)
-    compatible_mods = mod_manager.select_progression_mods(mods_list)
-    patch_data = mod_manager.combine_mods(compatible_mods)
-
-    mod_manager.create_patch_folder(patch_data, unpacked_mods)
-    # mod_manager.combine_icons(mods_list)
-    mod_manager.pack_patch(patch_data)
-    mod_manager.install_patch(patch_data)
+    if args.in_memory:
+        ModManager.file_system = MemoryFileSystem()
+    if args.watch:
+        with ModIndex() if args.index else nullcontext() as mod_index:
+            ModWatcher(ExtractionCache(), index=mod_index).run()
+        return
+    with profiler.stage("main"):
+        with profiler.stage("read_mods"):
+            mod_files = mod_manager.read_mods(cache=ExtractionCache())
+        with profiler.stage("load_mods"):
+            model_cache = ModelCache()
+            mods_list = mod_manager.load_mods(mod_files, model_cache)
+            model_cache.save()
+        if args.index:
+            with profiler.stage("index_mods"), ModIndex() as mod_index:
+                mod_index.update(mods_list)
+        with profiler.stage("select_progression_mods"):
+            compatible_mods = mod_manager.select_progression_mods(mods_list)
+        with profiler.stage("combine_mods"):
+            conflict_index = ConflictIndex()
+            patch_data = mod_manager.combine_mods(compatible_mods, MergeState(), conflict_index)
+            conflict_index.write_report()
+
+        # mod_manager.combine_icons(mods_list)
+        with profiler.stage("pack_patch"):
+            mod_manager.pack_patch(patch_data)
+        with profiler.stage("install_patch"):
+            mod_manager.install_patch(patch_data)
+    if args.profile:
+        profiler.write_report(args.profile)
     if info_level == "INFO":
         mod_manager.clean_up()
         input("Press Enter to continue...")
@@ -0,0 +1,70 @@
+import re
+from functools import lru_cache
+from typing import NamedTuple, Optional, Tuple
+
+BOOST_CALL = re.compile(r"\s*(\w+)\s*\((.*)\)\s*", re.DOTALL)
+
+
+class Boost(NamedTuple):
+    # A parsed entry of a Boosts attribute, e.g. ActionResource(SpellSlot,2,1)
+    function: Optional[str]
+    args: Tuple[str, ...]
+    # Whitespace-normalized text, equal for boosts that only differ in spacing
+    canonical: str
+    # Only set for ActionResource(<resource>,<amount>,<level>) boosts
+    resource: Optional[str] = None
+    amount: Optional[float] = None
+    level: Optional[int] = None
+
+    @property
+    def action_resource_key(self) -> Optional[Tuple[str, int]]:
+        return (self.resource, self.level) if self.resource is not None else None
+
+
+def split_args(args: str) -> Optional[Tuple[str, ...]]:
+    # Splits on the commas that aren't nested inside another call, None if the parentheses don't pair up
+    parts = []
+    depth = 0
+    start = 0
+    for index, char in enumerate(args):
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+            if depth < 0:
+                return None
+        elif char == ',' and depth == 0:
+            parts.append(args[start:index].strip())
+            start = index + 1
+    if depth != 0:
+        return None
+    parts.append(args[start:].strip())
+    return tuple(parts) if parts != [''] else ()
+
+
+def parse_number(value: str) -> Optional[float]:
+    try:
+        return int(value)
+    except ValueError:
+        try:
+            return float(value)
+        except ValueError:
+            return None
+
+
+# Boost strings repeat across thousands of progressions, so each distinct one is parsed once
+@lru_cache(maxsize=None)
+def parse_boost(boost: str) -> Boost:
+    match = BOOST_CALL.fullmatch(boost)
+    args = split_args(match.group(2)) if match else None
+    if args is None:
+        # Conditional boosts such as IF(...):Boost(...) are kept as opaque strings
+        return Boost(None, (), boost.strip())
+
+    function = match.group(1)
+    canonical = f"{function}({','.join(args)})"
+    if function == 'ActionResource' and len(args) == 3:
+        amount, level = parse_number(args[1]), parse_number(args[2])
+        if amount is not None and isinstance(level, int):
+            return Boost(function, args, canonical, args[0], amount, level)
+    return Boost(function, args, canonical)
@@ -1,30 +1,42 @@
 from lxml import etree
 from uuid import UUID
 from typing import Optional
+import sys
 import logging
+from utils.file_manager import FileManager
 
 
 class ClassDescription:
+    __slots__ = ('name', 'uuid', 'parent_guid')
+
     def __init__(self, name: str, uuid: str, parent_guid: str = None):
         try:
-            self.name = name
-            self.uuid = uuid
-            self.parent_guid = parent_guid or None
+            self.name = sys.intern(name)
+            self.uuid = sys.intern(uuid)
+            self.parent_guid = sys.intern(parent_guid) if parent_guid else None
         except Exception as e:
             logging.error(f"An error occurred while creating a ClassDescription: {e}")
 
     @staticmethod
     def load_from_xml(xml_string: str) -> 'ClassDescription':
         try:
-            root = etree.fromstring(xml_string)
-
-            name = root.xpath(".//attribute[@id='Name']/@value")[0]
-            uuid = root.xpath(".//attribute[@id='UUID']/@value")[0]
-
-            parent_guid_values = root.xpath(".//attribute[@id='ParentGuid']/@value")
-            parent_guid = parent_guid_values[0] if parent_guid_values else None
+            return ClassDescription.load_from_element(etree.fromstring(xml_string))
+        except Exception as e:
+            logging.error(f"An error occurred while loading ClassDescription from XML: {e}")
+            return None
 
-            return ClassDescription(name, uuid, parent_guid)
+    @staticmethod
+    def load_from_element(root: etree._Element) -> 'ClassDescription':
+        try:
+            attributes = FileManager.node_attributes(root)
+            return ClassDescription(attributes['Name'], attributes['UUID'], attributes.get('ParentGuid'))
         except Exception as e:
             logging.error(f"An error occurred while loading ClassDescription from XML: {e}")
             return None
+
+    def to_dict(self) -> dict:
+        return {"name": self.name, "uuid": self.uuid, "parent_guid": self.parent_guid}
+
+    @staticmethod
+    def from_dict(data: dict) -> 'ClassDescription':
+        return ClassDescription(data["name"], data["uuid"], data["parent_guid"])
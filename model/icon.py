@@ -1,8 +1,95 @@
 from model.class_description import ClassDescription
+from collections import Counter
 from difflib import SequenceMatcher
+from typing import Dict, List, Set, Union
+import re
 import logging
 
 
+class IconNameIndex:
+    # Number of trigram candidates that get a full SequenceMatcher comparison
+    CANDIDATES = 8
+
+    def __init__(self, icon_names: List[str]) -> None:
+        self.icon_names = list(icon_names)
+        self._exact = set(self.icon_names)
+        self._normalized: Dict[str, str] = {}
+        self._positions = {icon_name: position for position, icon_name in reversed(list(enumerate(self.icon_names)))}
+        self._trigrams: Dict[str, List[int]] = {}
+        self._matches: Dict[str, str] = {}
+        # Name length -> positions of the icon names of that length
+        self._lengths: Dict[int, List[int]] = {}
+
+        for position, icon_name in enumerate(self.icon_names):
+            self._lengths.setdefault(len(icon_name), []).append(position)
+            normalized_name = IconNameIndex.normalize(icon_name)
+            self._normalized.setdefault(normalized_name, icon_name)
+            for trigram in IconNameIndex.trigrams(normalized_name):
+                self._trigrams.setdefault(trigram, []).append(position)
+
+    @staticmethod
+    def normalize(name: str) -> str:
+        return re.sub(r'[^a-z0-9]', '', name.lower())
+
+    @staticmethod
+    def trigrams(text: str) -> Set[str]:
+        padded_text = f"  {text} "
+        return {padded_text[i:i + 3] for i in range(len(padded_text) - 2)}
+
+    # Returns the icon name closest to the specified name, caching the result
+    def match(self, name: str) -> str:
+        if name not in self._matches:
+            self._matches[name] = self._find_match(name)
+        return self._matches[name]
+
+    # Picks the same icon as comparing the name against every icon name, in a fraction of the comparisons
+    def _find_match(self, name: str) -> str:
+        if name in self._exact:
+            return name
+
+        shared_trigrams = Counter()
+        for trigram in IconNameIndex.trigrams(IconNameIndex.normalize(name)):
+            shared_trigrams.update(self._trigrams.get(trigram, ()))
+        shortlist = {position for position, _ in shared_trigrams.most_common(IconNameIndex.CANDIDATES)}
+        normalized_match = self._normalized.get(IconNameIndex.normalize(name))
+        if normalized_match is not None:
+            shortlist.add(self._positions[normalized_match])
+
+        # b is the queried name, as in SequenceMatcher(None, icon_name, name), so its lookup tables are built once
+        matcher = SequenceMatcher(None, "", name)
+        closest_position = None
+        highest_ratio = 0
+        for position in sorted(shortlist):
+            matcher.set_seq1(self.icon_names[position])
+            ratio = matcher.ratio()
+            if ratio > highest_ratio:
+                highest_ratio, closest_position = ratio, position
+
+        # The shortlist is only a guess, the rest is checked against upper bounds of the ratio so ties and
+        # better matches outside of it still win exactly as in a full scan
+        for length, positions in self._lengths.items():
+            # Two strings can't be more similar than their lengths allow, whole length groups are skipped on that
+            if 2 * min(length, len(name)) / ((length + len(name)) or 1) < highest_ratio:
+                continue
+            for position in positions:
+                if position in shortlist:
+                    continue
+                ratio = self._bounded_ratio(matcher, position, highest_ratio, closest_position)
+                if ratio is not None and (ratio > highest_ratio or position < closest_position):
+                    highest_ratio, closest_position = ratio, position
+        return self.icon_names[closest_position] if closest_position is not None else ""
+
+    # Returns the ratio of the icon name at position, or None as soon as a bound shows it can't win
+    def _bounded_ratio(self, matcher: SequenceMatcher, position: int, highest_ratio: float, closest_position: int):
+        matcher.set_seq1(self.icon_names[position])
+        wins_tie = closest_position is None or position < closest_position
+        for bound in (matcher.real_quick_ratio, matcher.quick_ratio, matcher.ratio):
+            ratio = bound()
+            if ratio < highest_ratio or (ratio == highest_ratio and not wins_tie) or ratio == 0:
+                return None
+        return ratio
+
+
 class Icon:
     def __init__(self, class_description: ClassDescription, mod_folder: str) -> None:
         try:
@@ -23,17 +110,10 @@ class Icon:
         except Exception as e:
             logging.error(f"An error occurred while getting an Icon's type: {e}")
 
-    def set_icon_name(self, icon_names_list: list) -> None:
-        closest_match = ""
-        highest_ratio = 0
-
-        for icon_name in icon_names_list:
-            ratio = SequenceMatcher(None, icon_name, self.icon_name).ratio()
-            if ratio > highest_ratio:
-                highest_ratio = ratio
-                closest_match = icon_name
-
-        self.icon_name = closest_match
+    def set_icon_name(self, icon_names: Union[List[str], IconNameIndex]) -> None:
+        if not isinstance(icon_names, IconNameIndex):
+            icon_names = IconNameIndex(icon_names)
+        self.icon_name = icon_names.match(self.icon_name)
 
     def icon_string(self) -> str:
         return (
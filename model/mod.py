@@ -1,20 +1,30 @@
 import os
 import logging
 from lxml import etree
-from typing import List, Optional, Dict
+from typing import Iterator, List, Optional, Dict, TextIO, Union
 from model.progression import Progression
 from model.class_description import ClassDescription
 from model.icon import Icon
 from utils.settings_manager import Paths
+from utils.file_manager import FileManager
+
+MODULE_INFO_NODES = etree.XPath("//node[@id='ModuleInfo']")
 
 
 class Mod:
+    # Files a mod is parsed from, in the order they are passed to __init__
+    MOD_FILES = ('meta.lsx', 'ClassDescriptions.lsx', 'Progressions.lsx')
+    # Attributes read from meta.lsx
+    META_FIELDS = ('author', 'description', 'folder', 'name', 'uuid')
+
     def __init__(self, unpacked_mod_folder: str = None, meta_xml_string: str = None, class_description_xml_string: str = None, progressions_xml_string: str = None):
         try:
             self.progressions: Optional[List[Progression]] = []
             self.icons: Optional[List[Icon]] = []
             self.class_descriptions: Optional[List[ClassDescription]] = []
             self.author: Optional[str] = None
+            # Hash of the files the mod was parsed from, set by ModManager.load_mods
+            self.fingerprint: Optional[str] = None
 
             if unpacked_mod_folder is not None:
                 self.unpacked_mod_folder = unpacked_mod_folder
@@ -34,12 +44,12 @@ class Mod:
         try:
             if meta_xml_string is not None:
                 meta_root = etree.fromstring(meta_xml_string)
-                module_info = meta_root.xpath(".//node[@id='ModuleInfo']")[0]
-                self.author = module_info.xpath(".//attribute[@id='Author']/@value")[0]
-                self.description = module_info.xpath(".//attribute[@id='Description']/@value")[0]
-                self.folder = module_info.xpath(".//attribute[@id='Folder']/@value")[0]
-                self.name = module_info.xpath(".//attribute[@id='Name']/@value")[0]
-                self.uuid = module_info.xpath(".//attribute[@id='UUID']/@value")[0]
+                module_info = FileManager.node_attributes(MODULE_INFO_NODES(meta_root)[0])
+                self.author = module_info['Author']
+                self.description = module_info['Description']
+                self.folder = module_info['Folder']
+                self.name = module_info['Name']
+                self.uuid = module_info['UUID']
             else:
                 # Default values for meta
                 self.author = "fierrof"
@@ -51,16 +61,13 @@ class Mod:
         except Exception as e:
             logging.error(f"An error occurred while parsing meta.lsx: {e}")
 
-    def load_progressions_from_string(self, progressions_xml_string: str):
+    def load_progressions_from_string(self, progressions_xml_string: Union[str, bytes]):
         # Parsing Progressions XML
         try:
             if progressions_xml_string is not None:
                 self.progressions = []
-                prog_root = etree.fromstring(progressions_xml_string)
-                progression_nodes = prog_root.xpath(".//node[@id='Progression']")
-                for node in progression_nodes:
-                    xml_string_progression = etree.tostring(node).decode()
-                    progression = Progression.load_progression_from_xml(xml_string_progression)
+                for node in FileManager.iter_xml_nodes(progressions_xml_string, 'Progression'):
+                    progression = Progression.load_progression_from_element(node)
                     if progression is None:
                         logging.warning(f"Progressions from {self.name} could not be loaded. Skipping mod...")
                         self.progressions = None
@@ -76,11 +83,8 @@ class Mod:
         try:
             if class_descriptions_xml_string is not None:
                 self.class_descriptions = []
-                class_desc_root = etree.fromstring(class_descriptions_xml_string)
-                class_desc_nodes = class_desc_root.xpath(".//node[@id='ClassDescription']")
-                for node in class_desc_nodes:
-                    xml_string_class_desc = etree.tostring(node).decode()
-                    class_description = ClassDescription.load_from_xml(xml_string_class_desc)
+                for node in FileManager.iter_xml_nodes(class_descriptions_xml_string, 'ClassDescription'):
+                    class_description = ClassDescription.load_from_element(node)
                     if class_description is None:
                         logging.warning(f"ClassDescriptions from {self.name} could not be loaded. Skipping...")
                         self.class_descriptions = None
@@ -96,6 +100,28 @@ class Mod:
             icon = Icon(class_description, self.folder)
             self.icons.append(icon)
 
+    # Parsed contents as plain data, without the icons which are derived from the class descriptions
+    def to_dict(self) -> dict:
+        data = {field: getattr(self, field, None) for field in Mod.META_FIELDS}
+        data["progressions"] = [p.to_dict() for p in self.progressions] if self.progressions is not None else None
+        data["class_descriptions"] = [c.to_dict() for c in self.class_descriptions] if self.class_descriptions is not None else None
+        return data
+
+    @staticmethod
+    def from_dict(data: dict, unpacked_mod_folder: str = None) -> 'Mod':
+        mod = Mod(unpacked_mod_folder)
+        for field in Mod.META_FIELDS:
+            setattr(mod, field, data[field])
+        if data["progressions"] is None:
+            mod.progressions = None
+        else:
+            mod.progressions = [Progression.from_dict(p) for p in data["progressions"]]
+        if data["class_descriptions"] is None:
+            mod.class_descriptions = None
+        else:
+            mod.class_descriptions = [ClassDescription.from_dict(c) for c in data["class_descriptions"]]
+        return mod
+
     def __str__(self):
         str_rep = (
             f"Mod Info:\n"
@@ -154,19 +180,29 @@ class Mod:
         )
 
     def progressions_string(self) -> str:
-        return (
-            '\n<?xml version="1.0" encoding="UTF-8"?>'
+        return ''.join(self.iter_progressions_strings())
+
+    # Writes Progressions.lsx to a text stream node by node instead of building it in memory
+    def write_progressions(self, stream: TextIO) -> None:
+        stream.writelines(self.iter_progressions_strings())
+
+    def iter_progressions_strings(self) -> Iterator[str]:
+        # The XML declaration has to be the very first thing in the file
+        yield (
+            '<?xml version="1.0" encoding="UTF-8"?>'
             '\n<save>'
             '\n<version major="4" minor="0" revision="9" build="330"/>'
             '\n<region id="Progressions">'
             '\n<node id="root">'
             '\n<children>'
-            f'{"".join([str(prog) for prog in self.progressions])}'
+        )
+        for progression in self.progressions:
+            yield from progression.iter_strings()
+        yield (
             '\n</children>'
             '\n</node>'
             '\n</region>'
             '\n</save>'
-
         )
 
     def module_string(self) -> str:
@@ -1,10 +1,22 @@
-from typing import List, Optional
+from typing import Iterator, List, Optional
+import sys
 import logging
 from lxml import etree
 from model.subclass import SubClass
+from utils.file_manager import FileManager
+
+SUBCLASS_NODES = etree.XPath("children/node[@id='SubClasses']/children/node")
+
+
+def intern_tokens(tokens: Optional[List[str]]) -> List[str]:
+    # The same boost, passive and selector names repeat across thousands of progressions
+    return [sys.intern(token) for token in tokens] if tokens else []
 
 
 class Progression:
+    __slots__ = ('uuid', 'name', 'table_uuid', 'level', 'allow_improvement', 'is_multiclass',
+                 'boosts', 'passives_added', 'passives_removed', 'selectors', 'subclasses')
+
     def __init__(self, uuid: str, name: str, table_uuid: str, level: int,
                  allow_improvement: bool = None,
                  is_multiclass: bool = None,
@@ -14,16 +26,16 @@ class Progression:
                  selectors: Optional[List[str]] = None,
                  subclasses: Optional[List[SubClass]] = None):
         try:
-            self.uuid = uuid
-            self.name = name
-            self.table_uuid = table_uuid
+            self.uuid = sys.intern(uuid)
+            self.name = sys.intern(name)
+            self.table_uuid = sys.intern(table_uuid)
             self.level = level
             self.allow_improvement = allow_improvement
             self.is_multiclass = is_multiclass
-            self.boosts = boosts or []
-            self.passives_added = passives_added or []
-            self.passives_removed = passives_removed or []
-            self.selectors = selectors or []
+            self.boosts = intern_tokens(boosts)
+            self.passives_added = intern_tokens(passives_added)
+            self.passives_removed = intern_tokens(passives_removed)
+            self.selectors = intern_tokens(selectors)
             self.subclasses = subclasses or []
         except Exception as e:
             logging.error(f"An error occurred while creating a Progression: {e}")
@@ -32,120 +44,135 @@ class Progression:
     @staticmethod
     def load_progression_from_xml(xml_string: str) -> 'Progression':
         try:
+            return Progression.load_progression_from_element(etree.fromstring(xml_string))
+        except Exception as e:
+            return None
 
-            root = etree.fromstring(xml_string)
-
-            uuid = root.xpath(".//attribute[@id='UUID']/@value")[0]
-            name = root.xpath(".//attribute[@id='Name']/@value")[0]
-            table_uuid = root.xpath(".//attribute[@id='TableUUID']/@value")[0]
-            level = int(root.xpath(".//attribute[@id='Level']/@value")[0])
-
-            allow_improvement_values = root.xpath(".//attribute[@id='AllowImprovement']/@value")
-            allow_improvement = bool(allow_improvement_values[0]) if allow_improvement_values else None
-
-            is_multiclass_values = root.xpath(".//attribute[@id='IsMulticlass']/@value")
-            is_multiclass = bool(is_multiclass_values[0]) if is_multiclass_values else None
-
-            boosts_values = root.xpath(".//attribute[@id='Boosts']/@value")
-            boosts = boosts_values[0].split(';') if boosts_values else []
+    @staticmethod
+    def load_progression_from_element(root: etree._Element) -> 'Progression':
+        try:
+            attributes = FileManager.node_attributes(root)
 
-            passives_added_values = root.xpath(".//attribute[@id='PassivesAdded']/@value")
-            passives_added = passives_added_values[0].split(';') if passives_added_values else []
+            uuid = attributes['UUID']
+            name = attributes['Name']
+            table_uuid = attributes['TableUUID']
+            level = int(attributes['Level'])
 
-            passives_removed_values = root.xpath(".//attribute[@id='PassivesRemoved']/@value")
-            passives_removed = passives_removed_values[0].split(';') if passives_removed_values else []
+            allow_improvement = bool(attributes['AllowImprovement']) if 'AllowImprovement' in attributes else None
+            is_multiclass = bool(attributes['IsMulticlass']) if 'IsMulticlass' in attributes else None
 
-            selectors_values = root.xpath(".//attribute[@id='Selectors']/@value")
-            selectors = selectors_values[0].split(';') if selectors_values else []
+            boosts = attributes['Boosts'].split(';') if 'Boosts' in attributes else []
+            passives_added = attributes['PassivesAdded'].split(';') if 'PassivesAdded' in attributes else []
+            passives_removed = attributes['PassivesRemoved'].split(';') if 'PassivesRemoved' in attributes else []
+            selectors = attributes['Selectors'].split(';') if 'Selectors' in attributes else []
 
-            sub_class_elements = root.xpath(".//node[@id='SubClasses']/children/node")
-            subclasses = [SubClass(el.xpath(".//attribute[@id='Object']/@value")[0]) for el in sub_class_elements] if sub_class_elements else []
+            subclasses = [SubClass(FileManager.node_attributes(el)['Object']) for el in SUBCLASS_NODES(root)]
 
             return Progression(uuid, name, table_uuid, level, allow_improvement, is_multiclass, boosts, passives_added, passives_removed, selectors, subclasses)
         except Exception as e:
             return None
 
+    def to_dict(self) -> dict:
+        return {
+            "uuid": self.uuid,
+            "name": self.name,
+            "table_uuid": self.table_uuid,
+            "level": self.level,
+            "allow_improvement": self.allow_improvement,
+            "is_multiclass": self.is_multiclass,
+            "boosts": list(self.boosts),
+            "passives_added": list(self.passives_added),
+            "passives_removed": list(self.passives_removed),
+            "selectors": list(self.selectors),
+            "subclasses": [subclass.uuid for subclass in self.subclasses],
+        }
+
+    @staticmethod
+    def from_dict(data: dict) -> 'Progression':
+        return Progression(data["uuid"], data["name"], data["table_uuid"], data["level"],
+                           data["allow_improvement"], data["is_multiclass"],
+                           data["boosts"], data["passives_added"], data["passives_removed"], data["selectors"],
+                           [SubClass(uuid) for uuid in data["subclasses"]])
+
     def __str__(self) -> str:
         try:
-            optional_attributes = []
-
-            if self.boosts:
-                optional_attributes.append(self.boosts_string())
-            if self.passives_added:
-                optional_attributes.append(self.passives_added_string())
-            if self.passives_removed:
-                optional_attributes.append(self.passives_removed_string())
-            if self.selectors:
-                optional_attributes.append(self.selectors_string())
-
-            if self.allow_improvement != None:
-                optional_attributes.append(self.allow_improvement_string())
-            if self.is_multiclass != None:
-                optional_attributes.append(self.is_multiclass_string())
-            return (
-                f'\n\n<!-- {self.name} -->'
-                f'\n<node id="Progression">'
-                f'\n  <attribute id="UUID" type="guid" value="{self.uuid}"/>'
-                f'\n  <attribute id="Name" type="LSString" value="{self.name}"/>'
-                f'\n  <attribute id="TableUUID" type="guid" value="{self.table_uuid}"/>'
-                f'\n  <attribute id="Level" type="uint8" value="{self.level}"/>'
-                f'\n  <attribute id="ProgressionType" type="uint8" value="0"/>'
-                f'{"".join(optional_attributes)}'
-                f'{self.subclasses_string()}'
-                '\n</node>'
-            )
+            return ''.join(self.iter_strings())
         except Exception as e:
             logging.error(f"An error occurred while creating Progression.__str__: {e}")
 
+    # Yields the node piece by piece so writers can stream it without building the whole string
+    def iter_strings(self) -> Iterator[str]:
+        yield (
+            f'\n\n<!-- {self.name} -->'
+            f'\n<node id="Progression">'
+            f'\n  <attribute id="UUID" type="guid" value="{self.uuid}"/>'
+            f'\n  <attribute id="Name" type="LSString" value="{self.name}"/>'
+            f'\n  <attribute id="TableUUID" type="guid" value="{self.table_uuid}"/>'
+            f'\n  <attribute id="Level" type="uint8" value="{self.level}"/>'
+            f'\n  <attribute id="ProgressionType" type="uint8" value="0"/>'
+        )
+        if self.boosts:
+            yield self.boosts_string()
+        if self.passives_added:
+            yield self.passives_added_string()
+        if self.passives_removed:
+            yield self.passives_removed_string()
+        if self.selectors:
+            yield self.selectors_string()
+
+        if self.allow_improvement != None:
+            yield self.allow_improvement_string()
+        if self.is_multiclass != None:
+            yield self.is_multiclass_string()
+        if self.subclasses:
+            yield self.subclasses_string()
+        yield '\n</node>'
+
     def boosts_string(self) -> str:
         try:
-            # Ensure all elements in the list are strings
-            if all(isinstance(item, str) for item in self.boosts):
-                value_string = ';'.join(self.boosts)
-                return f'\n<attribute id="Boosts" type="LSString" value="{value_string}"/>'
-            else:
-                logging.error("boosts should only contain strings.")
-                return ""
+            return self.list_attribute_string("Boosts", self.boosts)
+        except TypeError:
+            logging.error("boosts should only contain strings.")
+            return ""
         except Exception as e:
             logging.error(f"An error occurred while creating a Progression.boosts_string: {e}")
             return ""
 
     def passives_added_string(self) -> str:
         try:
-            if all(isinstance(item, str) for item in self.passives_added):
-                value_string = ';'.join(self.passives_added)
-                return f'\n<attribute id="PassivesAdded" type="LSString" value="{value_string}"/>'
-            else:
-                logging.error("passives_added should only contain strings.")
-                return ""
+            return self.list_attribute_string("PassivesAdded", self.passives_added)
+        except TypeError:
+            logging.error("passives_added should only contain strings.")
+            return ""
         except Exception as e:
             logging.error(f"An error occurred while creating a Progression.passives_added_string: {e}")
             return ""
 
     def passives_removed_string(self) -> str:
         try:
-            if all(isinstance(item, str) for item in self.passives_removed):
-                value_string = ';'.join(self.passives_removed)
-                return f'\n<attribute id="PassivesRemoved" type="LSString" value="{value_string}"/>'
-            else:
-                logging.error("passives_removed should only contain strings.")
-                return ""
+            return self.list_attribute_string("PassivesRemoved", self.passives_removed)
+        except TypeError:
+            logging.error("passives_removed should only contain strings.")
+            return ""
         except Exception as e:
             logging.error(f"An error occurred while creating a Progression.passives_removed_string: {e}")
             return ""
 
     def selectors_string(self) -> str:
         try:
-            if all(isinstance(item, str) for item in self.selectors):
-                value_string = ';'.join(self.selectors)
-                return f'\n<attribute id="Selectors" type="LSString" value="{value_string}"/>'
-            else:
-                logging.error("selectors should only contain strings.")
-                return ""
+            return self.list_attribute_string("Selectors", self.selectors)
+        except TypeError:
+            logging.error("selectors should only contain strings.")
+            return ""
         except Exception as e:
             logging.error(f"An error occurred while creating a Progression.selectors_string: {e}")
             return ""
 
+    # str.join raises a TypeError on non-string items, so no separate type scan is needed
+    @staticmethod
+    def list_attribute_string(attribute_id: str, values: List[str]) -> str:
+        return f'\n<attribute id="{attribute_id}" type="LSString" value="{";".join(values)}"/>'
+
     def allow_improvement_string(self) -> str:
         try:
             return (f'\n<attribute id="AllowImprovement" type="bool" value="{self.allow_improvement}"/>')
@@ -160,19 +187,16 @@ class Progression:
 
     def subclasses_string(self) -> str:
         try:
-            subclass_nodes = ''
-            for subclass in self.subclasses:
-                subclass_nodes += f'{subclass.__str__()}'
-            if self.subclasses:
-                subclass_nodes = (
-                    f'\n<children>'
-                    f'\n<node id="SubClasses">'
-                    f'\n<children>'
-                    f'\n{subclass_nodes}'
-                    f'\n</children>'
-                    f'\n</node>'
-                    f'\n</children>'
-                )
-            return subclass_nodes
+            if not self.subclasses:
+                return ''
+            return (
+                f'\n<children>'
+                f'\n<node id="SubClasses">'
+                f'\n<children>'
+                f'\n{"".join(subclass.__str__() for subclass in self.subclasses)}'
+                f'\n</children>'
+                f'\n</node>'
+                f'\n</children>'
+            )
         except Exception as e:
             logging.error(f"An error occurred while creating a Progression.subclasses_string: {e}")
@@ -1,9 +1,12 @@
+import sys
 import logging
 
 
 class SubClass:
+    __slots__ = ('uuid', 'name')
+
     def __init__(self, uuid: str, name: str = None):
-        self.uuid = uuid
+        self.uuid = sys.intern(uuid)
         self.name = "Subclass Name" if name is None else name
 
     def __str__(self) -> str:
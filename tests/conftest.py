@@ -0,0 +1,21 @@
+from typing import Callable, Dict
+import pytest
+import tests  # noqa: F401
+from benchmarks.corpus import generate_corpus
+from benchmarks.run import configure_paths
+from utils.settings_manager import Paths
+
+
+# Writes a synthetic corpus under tmp_path and points Paths at it, restoring the real paths afterwards
+@pytest.fixture
+def make_corpus(tmp_path) -> Callable[..., Dict[str, str]]:
+    saved_paths = {name: value for name, value in vars(Paths).items() if name.isupper()}
+
+    def make(mods: int, **kwargs) -> Dict[str, str]:
+        layout = generate_corpus(str(tmp_path), mods, **kwargs)
+        configure_paths(layout)
+        return layout
+
+    yield make
+    for name, value in saved_paths.items():
+        setattr(Paths, name, value)
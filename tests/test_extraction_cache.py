@@ -0,0 +1,36 @@
+import itertools
+from utils import extraction_cache
+from utils.extraction_cache import ExtractionCache
+
+
+def test_cached_files_read_back(tmp_path):
+    pak_path = tmp_path / "Mod.pak"
+    pak_path.write_bytes(b"package")
+    cache = ExtractionCache(str(tmp_path / "cache"))
+    digest = cache.fingerprint(str(pak_path))
+    files = {"meta.lsx": b"<save/>", "Public/Game/GUI/Library/IUI_ClassIcons.xaml": b"<ResourceDictionary/>"}
+    cache.put(digest, files)
+    cache.save()
+
+    reloaded = ExtractionCache(str(tmp_path / "cache"))
+    assert reloaded.fingerprint(str(pak_path)) == digest
+    assert reloaded.get(digest) == files
+    assert reloaded.get("unknown") is None
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, monkeypatch):
+    clock = itertools.count()
+    monkeypatch.setattr(extraction_cache.time, "time", lambda: next(clock))
+    cache = ExtractionCache(str(tmp_path / "cache"), max_size=20)
+    for name in ("first", "second", "third"):
+        pak_path = tmp_path / f"{name}.pak"
+        pak_path.write_bytes(name.encode())
+        cache.put(cache.fingerprint(str(pak_path)), {"meta.lsx": bytes(8)})
+    first, second, third = (cache.fingerprint(str(tmp_path / f"{name}.pak")) for name in ("first", "second", "third"))
+    cache.get(first)
+    cache.save()
+
+    assert set(cache.entries) == {first, third}
+    assert not (tmp_path / "cache" / second).exists()
+    assert str(tmp_path / "second.pak") not in cache.paks
+    assert set(ExtractionCache(str(tmp_path / "cache")).entries) == {first, third}
@@ -0,0 +1,25 @@
+import os
+from utils.lslib import LSLib
+from utils.lspk import LSPKWriter
+
+
+def test_packages_are_judged_by_their_own_result(make_corpus, tmp_path):
+    make_corpus(0)
+    source_folder = tmp_path / "paks"
+    source_folder.mkdir()
+    # An override pak without a meta.lsx is still a valid package
+    LSPKWriter.write_package(str(source_folder / "A.pak"), {"Public/Game/GUI/Assets/icon.DDS": bytes(16)})
+    (source_folder / "AA.pak").write_bytes(b"not a package")
+
+    results = LSLib.extract_packages([str(source_folder / "A.pak"), str(source_folder / "AA.pak")], str(tmp_path / "extracted"))
+    assert [result.success for result in results] == [True, False]
+    assert results[0].error is None
+    assert "AA.pak" in results[1].error
+    assert os.path.exists(os.path.join(results[0].destination_path, "Public", "Game", "GUI", "Assets", "icon.DDS"))
+
+
+def test_package_names_match_whole_file_names():
+    assert LSLib._names_package("Failed to extract AA.pak: bad magic", "AA.pak")
+    assert LSLib._names_package(r"Failed to extract C:\Mods\A.pak.", "A.pak")
+    assert not LSLib._names_package("Failed to extract AA.pak: bad magic", "A.pak")
+    assert not LSLib._names_package("Failed to extract A.pak_old: bad magic", "A.pak")
@@ -0,0 +1,56 @@
+import pytest
+from benchmarks import fake_divine
+from utils.lspk import LSPKError, LSPKReader, LSPKWriter
+from utils.mod_manager import ModManager
+
+
+def test_duplicate_file_names_are_read_like_the_extracted_package(tmp_path):
+    pak_path = str(tmp_path / "Duplicates.pak")
+    LSPKWriter.write_package(pak_path, {
+        "Mods/Second/meta.lsx": b"second",
+        "Mods/First/meta.lsx": b"first",
+        "Public/Second/Progressions/Progressions.lsx": b"second progressions",
+        "Public/First/Progressions/Progressions.lsx": b"first progressions",
+    })
+    with LSPKReader(pak_path) as reader:
+        assert reader.find_all_files(["meta.lsx"]) == {"meta.lsx": ["Mods/First/meta.lsx", "Mods/Second/meta.lsx"]}
+
+    fake_divine.extract_package(pak_path, str(tmp_path / "Duplicates"))
+    native_files = ModManager.extract_mod_files(pak_path)
+    assert native_files == ModManager.read_unpacked_mod(str(tmp_path / "Duplicates"))
+    assert native_files["meta.lsx"] == b"first"
+
+
+def test_written_package_reads_back(tmp_path):
+    pak_path = str(tmp_path / "RoundTrip.pak")
+    files = {
+        "Mods/RoundTrip/meta.lsx": b"<save/>",
+        "Public/RoundTrip/Progressions/Progressions.lsx": memoryview(b"<progressions/>" * 1000),
+        "Public/RoundTrip/Assets/empty.DDS": b"",
+        "Public/RoundTrip/Assets/noise.DDS": bytes(range(256)) * 64,
+    }
+    LSPKWriter.write_package(pak_path, files, priority=3)
+
+    with LSPKReader(pak_path) as reader:
+        assert reader.version == LSPKWriter.VERSION
+        assert list(reader.entries) == list(files)
+        for name, content in files.items():
+            assert reader.read(name) == bytes(content)
+        assert reader.read_files(["meta.lsx", "Progressions.lsx"]) == {
+            "meta.lsx": b"<save/>", "Progressions.lsx": b"<progressions/>" * 1000}
+
+
+def test_failed_write_leaves_no_package(tmp_path):
+    pak_path = tmp_path / "Broken.pak"
+    with pytest.raises(RuntimeError):
+        with LSPKWriter(str(pak_path)) as writer:
+            writer.add_file("Mods/Broken/meta.lsx", b"<save/>")
+            raise RuntimeError("build failed")
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_reading_a_file_that_is_not_a_package_fails(tmp_path):
+    pak_path = tmp_path / "NotAPackage.pak"
+    pak_path.write_bytes(b"PK\x03\x04" + bytes(64))
+    with pytest.raises(LSPKError):
+        LSPKReader(str(pak_path))
@@ -0,0 +1,52 @@
+import os
+from typing import Callable, List
+from model.mod import Mod
+from utils.merge_state import MergeState
+from utils.mod_manager import ModManager
+
+
+def merged(mods: List[Mod], merge_state: MergeState = None) -> List[dict]:
+    return [progression.to_dict() for progression in ModManager.combine_mods(mods, merge_state).progressions]
+
+
+def change_boosts(mods: List[Mod]) -> List[Mod]:
+    mods[2].fingerprint = "changed"
+    mods[2].progressions[0].boosts.append("Proficiency(Changed)")
+    return mods
+
+
+def test_incremental_merge_equals_full_merge(make_corpus, tmp_path):
+    layout = make_corpus(8, progressions=12, shared_ratio=0.7, paks=False)
+    mod_files = {os.path.join(layout["unpacked_dir"], folder): ModManager.read_unpacked_mod(os.path.join(layout["unpacked_dir"], folder))
+                 for folder in sorted(os.listdir(layout["unpacked_dir"])) if folder != "ImprovedUI Assets"}
+    state_file = str(tmp_path / "merge_state.json")
+
+    # Every step is checked against a full merge of freshly loaded mods, the merge extends progressions in place
+    steps: List[Callable[[List[Mod]], List[Mod]]] = [
+        lambda mods: mods,
+        lambda mods: mods,
+        change_boosts,
+        lambda mods: change_boosts(mods)[:5],
+        lambda mods: list(reversed(change_boosts(mods)[:5])),
+        lambda mods: list(reversed(mods)),
+        lambda mods: mods,
+    ]
+    for step in steps:
+        expected = merged(step(ModManager.load_mods(mod_files)))
+        # The state is reloaded from disk every time, like separate runs of the patcher
+        assert merged(step(ModManager.load_mods(mod_files)), MergeState(state_file)) == expected
+
+
+def test_unchanged_mods_are_not_merged_again(make_corpus, tmp_path, monkeypatch):
+    layout = make_corpus(4, progressions=8, shared_ratio=0.7, paks=False)
+    mod_files = {os.path.join(layout["unpacked_dir"], folder): ModManager.read_unpacked_mod(os.path.join(layout["unpacked_dir"], folder))
+                 for folder in sorted(os.listdir(layout["unpacked_dir"])) if folder != "ImprovedUI Assets"}
+    state_file = str(tmp_path / "merge_state.json")
+    merged(ModManager.load_mods(mod_files), MergeState(state_file))
+    saved_at = os.stat(state_file).st_mtime_ns
+
+    merge_calls = []
+    monkeypatch.setattr(ModManager, "merge_progression_lists", lambda *args: merge_calls.append(args))
+    merged(ModManager.load_mods(mod_files), MergeState(state_file))
+    assert merge_calls == []
+    assert os.stat(state_file).st_mtime_ns == saved_at
@@ -0,0 +1,51 @@
+from lxml import etree
+from utils.extraction_cache import ExtractionCache
+from utils.mod_manager import ModManager
+from utils.watcher import ModWatcher
+
+
+def reverse_load_order(modsettings_file: str) -> None:
+    tree = etree.parse(modsettings_file)
+    mod_order = tree.find(".//node[@id='ModOrder']/children")
+    modules = list(mod_order)
+    for module in modules:
+        mod_order.remove(module)
+    mod_order.extend(reversed(modules))
+    tree.write(modsettings_file, xml_declaration=True, encoding='UTF-8')
+
+
+def patch_hash(patch_data) -> str:
+    return ModManager.patch_hash(ModManager.patch_files(patch_data))
+
+
+# The patch a one-off run of main() builds from the same tree, without any cache or merge state
+def cold_patch_hash() -> str:
+    mods = ModManager.load_mods(ModManager.read_mods())
+    return patch_hash(ModManager.combine_mods(ModManager.select_progression_mods(mods)))
+
+
+def test_reordered_modules_are_patched_like_a_cold_run(make_corpus):
+    layout = make_corpus(6, progressions=10, shared_ratio=0.9)
+    watcher = ModWatcher(ExtractionCache(), debounce=0)
+    watcher.update_patch(watcher.snapshot())
+    original_hash = patch_hash(watcher.patch_data)
+    assert original_hash == cold_patch_hash()
+
+    reverse_load_order(layout["modsettings_file"])
+    watcher.update_patch(watcher.snapshot())
+    reordered_hash = patch_hash(watcher.patch_data)
+    assert reordered_hash != original_hash
+    assert reordered_hash == cold_patch_hash()
+    assert ModManager.load_patch_state()["pak_hash"] == reordered_hash
+
+
+def test_rewritten_modsettings_in_the_same_order_keeps_the_patch(make_corpus):
+    layout = make_corpus(4, progressions=10, shared_ratio=0.9)
+    watcher = ModWatcher(ExtractionCache(), debounce=0)
+    watcher.update_patch(watcher.snapshot())
+    patch_data = watcher.patch_data
+
+    reverse_load_order(layout["modsettings_file"])
+    reverse_load_order(layout["modsettings_file"])
+    watcher.update_patch(watcher.snapshot())
+    assert watcher.patch_data is patch_data
@@ -0,0 +1,37 @@
+from lxml import etree
+from benchmarks.corpus import modsettings_lsx
+from utils.xml_edit_session import XmlEditSession
+
+UUID_KEY = XmlEditSession.attribute_key('UUID')
+
+
+def module(uuid: str, folder: str = None) -> str:
+    folder_attribute = f'<attribute id="Folder" value="{folder}" type="LSString"/>' if folder else ''
+    return f'<node id="ModuleShortDesc">{folder_attribute}<attribute id="UUID" value="{uuid}" type="FixedString"/></node>'
+
+
+def folders(modsettings_file: str) -> list:
+    return etree.parse(modsettings_file).xpath("//node[@id='ModuleShortDesc']/attribute[@id='Folder']/@value")
+
+
+def test_upsert_replaces_the_node_with_the_same_key_in_place(tmp_path):
+    modsettings_file = str(tmp_path / "modsettings.lsx")
+    (tmp_path / "modsettings.lsx").write_text(modsettings_lsx(3))
+
+    with XmlEditSession(modsettings_file) as modsettings:
+        assert modsettings.upsert("//node[@id='ModuleShortDesc']", module("benchmark-mod-0001", "Renamed"), UUID_KEY) == "Element updated"
+        assert modsettings.upsert("//node[@id='ModuleShortDesc']", module("patch", "Patch"), UUID_KEY) == "Element inserted"
+        # The index follows the edits made earlier in the session
+        assert modsettings.upsert("//node[@id='ModuleShortDesc']", module("patch", "Patch"), UUID_KEY) == "Element already exists"
+    assert folders(modsettings_file) == ["BenchmarkMod0000", "Renamed", "BenchmarkMod0002", "Patch"]
+
+
+def test_unchanged_upsert_leaves_the_file_alone(tmp_path):
+    modsettings_file = tmp_path / "modsettings.lsx"
+    modsettings_file.write_text(modsettings_lsx(2))
+    original = modsettings_file.read_bytes()
+
+    with XmlEditSession(str(modsettings_file)) as modsettings:
+        assert modsettings.upsert("//node[@id='ModuleShortDesc']", module("benchmark-mod-0000", "BenchmarkMod0000"), UUID_KEY) == "Element already exists"
+    assert not modsettings.modified
+    assert modsettings_file.read_bytes() == original
@@ -0,0 +1,120 @@
+import os
+import logging
+from collections import Counter
+from typing import Dict, Hashable, List, Tuple
+from model.boost import parse_boost
+from model.progression import Progression
+from utils.file_manager import FileManager
+from utils.settings_manager import Paths
+
+SCALAR_FIELDS = ('name', 'table_uuid', 'level', 'allow_improvement', 'is_multiclass')
+# Boosts are compared by their parsed text, next to these
+LIST_FIELDS = ('passives_added', 'passives_removed', 'selectors')
+
+
+class ConflictIndex:
+    # Records, while progressions are merged, the fields mods disagree on and the levels defined under several UUIDs
+    # Every progression is visited once, so building it is linear in the number of progressions and not in mod pairs
+    # Mods are recorded by their MergeState.mod_keys key, names are only looked up for the report
+    def __init__(self):
+        # Mod key -> mod name shown in the report
+        self.mod_names: Dict[str, str] = {}
+        # Mod name -> number of mod keys that carry it
+        self._name_counts: Counter = Counter()
+        # Progression UUID -> mods that define it, in load order
+        self.progression_mods: Dict[str, List[str]] = {}
+        # Progression UUID -> the only progression seen for it so far
+        self._first: Dict[str, Progression] = {}
+        # Progression UUID -> field -> value -> mods that set it, for progressions defined by several mods
+        self.field_values: Dict[str, Dict[str, Dict[Hashable, List[str]]]] = {}
+        # Progression UUID -> (resource, level) -> amount -> mods, the merge keeps only the highest amount
+        self.action_resources: Dict[str, Dict[Tuple[str, int], Dict[float, List[str]]]] = {}
+        # (TableUUID, Level) -> progression UUID -> mods that define it
+        self.levels: Dict[Tuple[str, int], Dict[str, List[str]]] = {}
+
+    def add_mod_names(self, mod_keys: List[str], mod_names: List[str]) -> None:
+        self.mod_names.update(zip(mod_keys, mod_names))
+        self._name_counts = Counter(self.mod_names.values())
+
+    # Progressions must be added before anything is merged into them, the merge extends their lists in place
+    def add(self, mod_key: str, progression: Progression) -> None:
+        self.levels.setdefault((progression.table_uuid, progression.level), {}).setdefault(progression.uuid, []).append(mod_key)
+        mods = self.progression_mods.get(progression.uuid)
+        if mods is None:
+            # Most progressions come from a single mod, so their fields are only recorded once a second mod shows up
+            self.progression_mods[progression.uuid] = [mod_key]
+            self._first[progression.uuid] = progression
+            return
+
+        if len(mods) == 1:
+            self._record(mods[0], self._first.pop(progression.uuid))
+        mods.append(mod_key)
+        self._record(mod_key, progression)
+
+    def _record(self, mod_key: str, progression: Progression) -> None:
+        fields = self.field_values.setdefault(progression.uuid, {})
+        for field in SCALAR_FIELDS:
+            fields.setdefault(field, {}).setdefault(getattr(progression, field), []).append(mod_key)
+
+        boosts = [parse_boost(boost) for boost in progression.boosts]
+        resources = self.action_resources.setdefault(progression.uuid, {})
+        for boost in boosts:
+            if boost.resource is not None:
+                resources.setdefault(boost.action_resource_key, {}).setdefault(boost.amount, []).append(mod_key)
+
+        # Order and repeats don't change what the merged progression contains
+        fields.setdefault('boosts', {}).setdefault(frozenset(boost.canonical for boost in boosts), []).append(mod_key)
+        for field in LIST_FIELDS:
+            fields.setdefault(field, {}).setdefault(frozenset(getattr(progression, field)), []).append(mod_key)
+
+    def add_all(self, mod_key: str, progressions: List[Progression]) -> None:
+        for progression in progressions:
+            self.add(mod_key, progression)
+
+    # Mod keys -> names, mods that share a name are told apart by their key
+    def _display_names(self, mod_keys: List[str]) -> List[str]:
+        return [self._display_name(key) for key in mod_keys]
+
+    def _display_name(self, mod_key: str) -> str:
+        name = self.mod_names.get(mod_key)
+        if not name:
+            return mod_key
+        return name if self._name_counts[name] == 1 else f"{name} ({mod_key})"
+
+    def field_conflicts(self) -> List[dict]:
+        conflicts = []
+        for uuid, mods in self.progression_mods.items():
+            if uuid not in self.field_values:
+                continue
+            fields = {field: [{"value": sorted(value) if isinstance(value, frozenset) else value, "mods": self._display_names(value_mods)}
+                              for value, value_mods in values.items()]
+                      for field, values in self.field_values[uuid].items() if len(values) > 1}
+            resources = [{"resource": resource, "level": level,
+                          "amounts": [{"amount": amount, "mods": self._display_names(amount_mods)} for amount, amount_mods in amounts.items()]}
+                         for (resource, level), amounts in self.action_resources[uuid].items() if len(amounts) > 1]
+            if fields or resources:
+                name = next(iter(self.field_values[uuid]['name']))
+                conflicts.append({"uuid": uuid, "name": name, "mods": self._display_names(mods), "fields": fields,
+                                  "action_resources": resources})
+        return conflicts
+
+    def level_conflicts(self) -> List[dict]:
+        return [{"table_uuid": table_uuid, "level": level,
+                 "progressions": [{"uuid": uuid, "mods": self._display_names(mods)} for uuid, mods in progressions.items()]}
+                for (table_uuid, level), progressions in self.levels.items() if len(progressions) > 1]
+
+    def report(self) -> dict:
+        return {
+            "progressions": len(self.progression_mods),
+            "field_conflicts": self.field_conflicts(),
+            "level_conflicts": self.level_conflicts(),
+        }
+
+    def write_report(self, path: str = None) -> dict:
+        path = path or Paths.CONFLICT_REPORT_FILE
+        report = self.report()
+        FileManager.create_folder(os.path.dirname(os.path.abspath(path)))
+        FileManager.save_object_to_json(report, path)
+        logging.info(f"Found {len(report['field_conflicts'])} conflicting progressions and "
+                     f"{len(report['level_conflicts'])} levels defined under several UUIDs, see {path}")
+        return report
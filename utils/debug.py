@@ -1,6 +1,12 @@
+import atexit
+import copy
 import logging
+import logging.handlers
 import os
-from typing import Literal
+import queue
+from typing import Dict, List, Literal, Optional
+
+_listener: Optional[logging.handlers.QueueListener] = None
 
 
 class ColoredFormatter(logging.Formatter):
@@ -11,20 +17,131 @@ class ColoredFormatter(logging.Formatter):
         'CRITICAL': '41',  # Red
         'ERROR': '31'     # Red
     }
+    SUCCESS_COLOR = '32'  # Green for 'successfully' within 'INFO'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Message template -> whether it contains 'successfully', checked once per template
+        self._success_templates: Dict[str, bool] = {}
 
     def format(self, record):
         log_color = self.COLORS.get(record.levelname, '37')  # Default to white
 
-        if record.levelname == 'INFO' and 'successfully' in record.msg:
-            log_color = '32'  # Green for 'successfully' within 'INFO'
-
-        if record.levelname == 'INFO' and 'Successfully' in record.msg:
-            log_color = '32'  # Green for 'Successfully' within 'INFO'
+        if record.levelno == logging.INFO:
+            template = record.msg if isinstance(record.msg, str) else str(record.msg)
+            is_success = self._success_templates.get(template)
+            if is_success is None:
+                is_success = 'successfully' in template or 'Successfully' in template
+                if len(self._success_templates) < 4096:
+                    self._success_templates[template] = is_success
+            if is_success:
+                log_color = ColoredFormatter.SUCCESS_COLOR
 
         return f"\033[1;{log_color}m{super().format(record)}\033[1;m"
 
 
-def setup_logger(log_level=Literal["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"]):
+class DebugAggregator:
+    # Lets through at most `limit` DEBUG records per message template in each `interval` seconds
+    def __init__(self, limit: int = 20, interval: float = 1.0):
+        self.limit = limit
+        self.interval = interval
+        # Message template -> [window start, records in window, records suppressed in window, (logger, message) last suppressed]
+        self._windows: Dict[str, list] = {}
+        self._last_sweep = 0.0
+
+    def admit(self, record: logging.LogRecord) -> List[logging.LogRecord]:
+        now = record.created
+        records = self._expire(now) if now - self._last_sweep >= self.interval else []
+        template = record.msg if isinstance(record.msg, str) else str(record.msg)
+        window = self._windows.get(template)
+        if window is None or now - window[0] >= self.interval:
+            if window is not None and window[2]:
+                records.append(DebugAggregator.summary(window))
+            window = self._windows[template] = [now, 0, 0, None]
+
+        window[1] += 1
+        if window[1] <= self.limit:
+            records.append(record)
+        else:
+            window[2] += 1
+            window[3] = (record.name, record.getMessage())
+        return records
+
+    # Drops the windows that ended, f-string messages open a new one for every distinct text
+    def _expire(self, now: float) -> List[logging.LogRecord]:
+        self._last_sweep = now
+        expired = [template for template, window in self._windows.items() if now - window[0] >= self.interval]
+        records = []
+        for template in expired:
+            window = self._windows.pop(template)
+            if window[2]:
+                records.append(DebugAggregator.summary(window))
+        return records
+
+    # Summaries for every template that still has suppressed records
+    def flush(self) -> List[logging.LogRecord]:
+        records = [DebugAggregator.summary(window) for window in self._windows.values() if window[2]]
+        self._windows.clear()
+        return records
+
+    @staticmethod
+    def summary(window: list) -> logging.LogRecord:
+        logger_name, last_message = window[3]
+        return logging.makeLogRecord({
+            "name": logger_name,
+            "levelno": logging.DEBUG,
+            "levelname": "DEBUG",
+            "msg": "Suppressed %d more messages like: %s",
+            "args": (window[2], last_message),
+        })
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    # Queues records with only msg % args applied, timestamps, colors and I/O are left to the listener thread
+    def __init__(self, log_queue: queue.Queue, aggregator: DebugAggregator = None):
+        super().__init__(log_queue)
+        self.aggregator = aggregator
+
+    # Renders the message now, as QueueHandler.prepare does, so mutable args can't change before the listener runs
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def emit(self, record):
+        if self.aggregator is None or record.levelno != logging.DEBUG:
+            return super().emit(record)
+        for admitted_record in self.aggregator.admit(record):
+            super().emit(admitted_record)
+
+    def flush(self):
+        if self.aggregator is not None:
+            self.acquire()
+            try:
+                for summary_record in self.aggregator.flush():
+                    super().emit(summary_record)
+            finally:
+                self.release()
+
+
+def stop_logger():
+    global _listener
+    logger = logging.getLogger()
+    for handler in logger.handlers:
+        handler.flush()
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+atexit.register(stop_logger)
+
+
+def setup_logger(log_level=Literal["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"], debug_limit: Optional[int] = 20):
+    global _listener
     log_dir = "logs"
     if not os.path.exists(log_dir):
         os.makedirs(log_dir)
@@ -35,6 +152,7 @@ def setup_logger(log_level=Literal["DEBUG", "INFO", "WARNING", "ERROR", "CRITICA
     with open("logs/application.log", "w"):
         pass  # Clearing the application log
 
+    stop_logger()
     logger = logging.getLogger()
     logger.setLevel(log_level)
 
@@ -55,16 +173,21 @@ def setup_logger(log_level=Literal["DEBUG", "INFO", "WARNING", "ERROR", "CRITICA
     debug_file_formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
     debug_file_handler.setFormatter(debug_file_formatter)
     debug_file_handler.setLevel(logging.DEBUG)
-    logger.addHandler(debug_file_handler)
 
     general_file_handler = logging.FileHandler("logs/application.log")
     general_file_formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
     general_file_handler.setFormatter(general_file_formatter)
     general_file_handler.setLevel(logging.INFO)
-    logger.addHandler(general_file_handler)
 
     # Console handler
     console_handler = logging.StreamHandler()
     colored_formatter = ColoredFormatter('%(asctime)s - %(levelname)s - %(message)s')
     console_handler.setFormatter(colored_formatter)
-    logger.addHandler(console_handler)
+
+    # The caller only enqueues records, formatting and I/O happen on the listener thread
+    log_queue = queue.SimpleQueue()
+    aggregator = DebugAggregator(debug_limit) if debug_limit else None
+    logger.addHandler(DeferredQueueHandler(log_queue, aggregator))
+    _listener = logging.handlers.QueueListener(
+        log_queue, debug_file_handler, general_file_handler, console_handler, respect_handler_level=True)
+    _listener.start()
@@ -0,0 +1,99 @@
+import os
+import time
+import hashlib
+import logging
+import threading
+from typing import Dict, Optional
+from utils.file_manager import FileManager
+from utils.settings_manager import Paths
+
+
+class ExtractionCache:
+    INDEX_FILE = "index.json"
+    MAX_SIZE = 256 * 1024 * 1024
+    HASH_CHUNK_SIZE = 1024 * 1024
+
+    def __init__(self, cache_dir: str = None, max_size: int = None):
+        self.cache_dir = cache_dir or Paths.EXTRACTION_CACHE_DIR
+        self.max_size = max_size or ExtractionCache.MAX_SIZE
+        self.index_path = os.path.join(self.cache_dir, ExtractionCache.INDEX_FILE)
+        self._lock = threading.Lock()
+
+        FileManager.create_folder(self.cache_dir)
+        index = FileManager.load_object_from_json(None, self.index_path)
+        # paks: pak path -> {size, mtime, hash}, entries: content hash -> {files, size, last_used}
+        self.paks: Dict[str, dict] = index.get("paks", {})
+        self.entries: Dict[str, dict] = index.get("entries", {})
+
+    # Returns the content hash of a .pak, rehashing only when its size or mtime changed
+    def fingerprint(self, pak_path: str) -> str:
+        stat = os.stat(pak_path)
+        with self._lock:
+            known = self.paks.get(pak_path)
+        if known and known["size"] == stat.st_size and known["mtime"] == stat.st_mtime_ns:
+            return known["hash"]
+
+        sha256 = hashlib.sha256()
+        with open(pak_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(ExtractionCache.HASH_CHUNK_SIZE), b''):
+                sha256.update(chunk)
+        digest = sha256.hexdigest()
+
+        with self._lock:
+            self.paks[pak_path] = {"size": stat.st_size, "mtime": stat.st_mtime_ns, "hash": digest}
+        return digest
+
+    def get(self, digest: str) -> Optional[Dict[str, bytes]]:
+        with self._lock:
+            entry = self.entries.get(digest)
+            if entry is None:
+                return None
+            entry["last_used"] = time.time()
+
+        try:
+            files = {}
+            for file_name in entry["files"]:
+                with open(os.path.join(self.cache_dir, digest, *file_name.split('/')), 'rb') as f:
+                    files[file_name] = f.read()
+            return files
+        except OSError as e:
+            logging.warning(f"Extraction cache entry {digest} is unreadable, discarding it: {e}")
+            with self._lock:
+                self.entries.pop(digest, None)
+            return None
+
+    def put(self, digest: str, files: Dict[str, bytes]) -> None:
+        try:
+            entry_dir = os.path.join(self.cache_dir, digest)
+            FileManager.create_folder(entry_dir)
+            for file_name, content in files.items():
+                # Staged files are keyed by their path in the package
+                file_path = os.path.join(entry_dir, *file_name.split('/'))
+                FileManager.create_folder(os.path.dirname(file_path))
+                with open(file_path, 'wb') as f:
+                    f.write(content)
+            with self._lock:
+                self.entries[digest] = {
+                    "files": list(files),
+                    "size": sum(len(content) for content in files.values()),
+                    "last_used": time.time(),
+                }
+        except Exception as e:
+            logging.error(f"An error occurred while caching extracted files: {e}")
+
+    # Drops the least recently used entries until the cache fits in max_size
+    def evict(self) -> None:
+        total_size = sum(entry["size"] for entry in self.entries.values())
+        for digest in sorted(self.entries, key=lambda d: self.entries[d]["last_used"]):
+            if total_size <= self.max_size:
+                break
+            total_size -= self.entries.pop(digest)["size"]
+            FileManager.delete_folder(os.path.join(self.cache_dir, digest))
+            logging.debug("Evicted %s from the extraction cache", digest)
+
+        self.paks = {path: pak for path, pak in self.paks.items() if pak["hash"] in self.entries}
+
+    def save(self) -> None:
+        with self._lock:
+            self.evict()
+            FileManager.save_object_to_json({"paks": self.paks, "entries": self.entries}, self.index_path)
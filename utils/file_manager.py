@@ -1,11 +1,14 @@
+import io
 import os
 import shutil
 import logging
 import json
 from lxml import etree
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Union
 from typing import Literal
 from utils.enums import FileType
+from utils.xml_edit_session import XmlEditSession
+from utils.profiler import profiler
 
 
 class FileManager:
@@ -16,7 +19,7 @@ class FileManager:
         if not os.path.exists(path):
             try:
                 os.makedirs(path)
-                logging.debug(f"Created directory {path}")
+                logging.debug("Created directory %s", path)
             except Exception as e:
                 logging.error(f"Failed to create directory {path}: {e}")
                 return False
@@ -38,10 +41,10 @@ class FileManager:
                 try:
                     if os.path.isfile(file_path) or os.path.islink(file_path):
                         os.unlink(file_path)
-                        logging.debug(f'Successfully deleted {file_path}')
+                        logging.debug('Successfully deleted %s', file_path)
                     elif os.path.isdir(file_path):
                         shutil.rmtree(file_path)
-                        logging.debug(f'Successfully deleted directory {file_path}')
+                        logging.debug('Successfully deleted directory %s', file_path)
                 except Exception as e:
                     logging.error(f'Failed to delete {file_path}. Reason: {e}')
         except Exception as e:
@@ -53,6 +56,7 @@ class FileManager:
         found_files = {}
         try:
             for root, dirs, files in os.walk(folder_path):
+                profiler.count("files_walked", len(files))
                 for filename in files:
                     if filename in target_filenames:
                         found_files[filename] = os.path.join(root, filename)
@@ -63,6 +67,25 @@ class FileManager:
 
         return found_files
 
+    # Indexes every file in the specified folder by name, walking the tree only once
+    @staticmethod
+    def index_files(folder_path: str) -> Dict[str, List[str]]:
+        file_index = {}
+        pending_folders = [folder_path]
+        try:
+            while pending_folders:
+                with os.scandir(pending_folders.pop()) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            pending_folders.append(entry.path)
+                        else:
+                            file_index.setdefault(entry.name, []).append(entry.path)
+                            profiler.count("files_walked")
+        except Exception as e:
+            logging.error(f"An error occurred while indexing files: {e}")
+
+        return file_index
+
     # Searches for folders with the specified names in the specified folder
     @staticmethod
     def find_folders(folder_path: str, target_folder_names: List[str]) -> Dict[str, str]:
@@ -87,11 +110,20 @@ class FileManager:
         try:
             with open(path, 'w') as f:
                 f.write('')  # Create an empty file
-            logging.debug(f"Created file {path}")
+            logging.debug("Created file %s", path)
         except Exception as e:
             logging.error(f"Failed to create file {path}: {e}")
             return False
 
+    # Returns the size and modification time of a file, or None if it doesn't exist
+    @staticmethod
+    def file_fingerprint(path: str) -> Optional[List[int]]:
+        try:
+            stat = os.stat(path)
+            return [stat.st_size, stat.st_mtime_ns]
+        except OSError:
+            return None
+
     # Writes content to a file
     @staticmethod
     def write_file(path: str, content: str, mode: Literal['a', 'w'] = 'w', insert_at: int = None):
@@ -111,15 +143,26 @@ class FileManager:
             logging.error(f"Failed to write to file {path} in {mode} mode: {e}")
             return False
 
+    # Streams text chunks into a file, creating its folder if needed, without pre-creating an empty file
+    @staticmethod
+    def write_chunks(path: str, chunks: Iterable[str]) -> bool:
+        try:
+            FileManager.create_folder(os.path.dirname(path))
+            with open(path, 'w', encoding='utf-8') as f:
+                f.writelines(chunks)
+            return True
+        except Exception as e:
+            logging.error(f"Failed to write to file {path}: {e}")
+            return False
+
     # Saves an object instance to a JSON file
     @staticmethod
     def save_object_to_json(obj, path):
         try:
+            # json.dumps encodes in C, json.dump streams through the much slower pure Python encoder
+            content = json.dumps(obj if isinstance(obj, dict) else obj.__dict__)
             with open(path, 'w') as f:
-                if isinstance(obj, dict):
-                    json.dump(obj, f)
-                else:
-                    json.dump(obj.__dict__, f)
+                f.write(content)
             logging.info(f"Saved object instance to {path}")
         except Exception as e:
             logging.error(f"Failed to save object instance to {path}: {e}")
@@ -170,46 +213,37 @@ class FileManager:
 
     @staticmethod
     def insert_string_to_xml(xml_file_path, xpath_expr, string_to_insert, namespace=None, position: Literal['first', 'last'] = 'last'):
-        # Parse the XML file
-        tree = etree.parse(xml_file_path)
-        root = tree.getroot()
-
-        # If a namespace is provided, update the XPath expression to include it
-        if namespace:
-            xpath_expr = xpath_expr.replace('//', f"//{namespace}:")
-
-        # Find all nodes using the XPath expression
-        nsmap = {namespace: root.nsmap[None]} if namespace else None
-        nodes = root.xpath(xpath_expr, namespaces=nsmap)
-
-        # If no node matching the XPath is found, return
-        if not nodes:
-            return "No node found"
-
-        # Parse the string to insert into an Element object
-        new_element = etree.fromstring(string_to_insert)
-
-        # Check if the element already exists
-        existing_nodes = [node for node in nodes if (
-            node.tag == new_element.tag and
-            node.attrib == new_element.attrib and
-            len(node) == len(new_element) and
-            all(c1.tag == c2.tag and c1.attrib == c2.attrib for c1, c2 in zip(node, new_element))
-        )]
+        with XmlEditSession(xml_file_path, namespace) as session:
+            result = session.insert(xpath_expr, string_to_insert, position)
+        return None if result == "Element inserted" else result
 
-        if existing_nodes:
-            return "Element already exists"
-
-        # Choose the target node based on the position parameter
-        target_node = nodes[0] if position == 'first' else nodes[-1]
-
-        # Insert the new element after the last node
-        parent = target_node.getparent()
-        index = parent.index(target_node)
-        parent.insert(index + 1, new_element)
-
-        # Save the modified XML back to the file
-        tree.write(xml_file_path, pretty_print=True, xml_declaration=True, encoding="UTF-8")
+    # Streams the nodes with the specified id, freeing each subtree once the caller is done with it
+    @staticmethod
+    def iter_xml_nodes(xml_source: Union[str, bytes], node_id: str) -> Iterator[etree._Element]:
+        if isinstance(xml_source, str):
+            xml_source = xml_source.encode('utf-8')
+        parsed_nodes = 0
+        try:
+            for _, node in etree.iterparse(io.BytesIO(xml_source), events=('end',), tag='node'):
+                parsed_nodes += 1
+                if node.get('id') != node_id:
+                    continue
+                yield node
+                node.clear()
+                while node.getprevious() is not None:
+                    del node.getparent()[0]
+        finally:
+            profiler.count("xml_nodes_parsed", parsed_nodes)
+
+    # Maps the ids of a node's direct attribute children to their values in a single pass
+    @staticmethod
+    def node_attributes(node: etree._Element) -> Dict[str, str]:
+        attributes = {}
+        for attribute in node.iterchildren('attribute'):
+            value = attribute.get('value')
+            if value is not None:
+                attributes.setdefault(attribute.get('id'), value)
+        return attributes
 
     @staticmethod
     def xml_to_string(xml_file_path):
@@ -255,7 +289,7 @@ class FileManager:
     def copy_folder(src_path, dest_path):
         try:
             if not os.path.exists(src_path):
-                logging.debug(f"Source folder {src_path} does not exist. Skipping...")
+                logging.debug("Source folder %s does not exist. Skipping...", src_path)
                 return
             if not os.path.exists(dest_path):
                 os.makedirs(dest_path)
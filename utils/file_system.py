@@ -0,0 +1,139 @@
+import os
+import shutil
+import logging
+import tempfile
+import threading
+from typing import Dict, Iterable, List, Union
+from utils.file_manager import FileManager
+from utils.settings_manager import Paths
+
+
+class DiskFileSystem:
+    # Stores files under a folder on disk, Paths.TEMP_DIR unless another root is given
+    def __init__(self, root: str = None):
+        self._root = root
+
+    @property
+    def root(self) -> str:
+        # Resolved on use so changes to Paths.TEMP_DIR after import are picked up
+        return self._root or Paths.TEMP_DIR
+
+    def real_path(self, path: str) -> str:
+        return os.path.join(self.root, *path.split('/'))
+
+    def exists(self, path: str) -> bool:
+        return os.path.isfile(self.real_path(path))
+
+    def read(self, path: str) -> bytes:
+        with open(self.real_path(path), 'rb') as f:
+            return f.read()
+
+    def write(self, path: str, data: bytes) -> None:
+        file_path = self.real_path(path)
+        FileManager.create_folder(os.path.dirname(file_path))
+        temp_path = file_path + ".tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, file_path)
+
+    def write_chunks(self, path: str, chunks: Iterable[str]) -> bool:
+        return FileManager.write_chunks(self.real_path(path), chunks)
+
+    def clear(self) -> None:
+        FileManager.create_folder(self.root)
+        FileManager.clean_folder(self.root)
+
+
+class MemoryFileSystem:
+    # Keeps files in memory, spilling the ones larger than spill_threshold bytes to a temporary folder
+    SPILL_THRESHOLD = 32 * 1024 * 1024
+
+    def __init__(self, spill_threshold: int = None):
+        self.spill_threshold = spill_threshold or MemoryFileSystem.SPILL_THRESHOLD
+        # Virtual path -> content, the chunks it was streamed as, or the path of the spilled file on disk
+        self._files: Dict[str, Union[bytes, List[bytes], str]] = {}
+        self._spill_dir = None
+        self._spilled = 0
+        self._lock = threading.Lock()
+
+    def exists(self, path: str) -> bool:
+        return path in self._files
+
+    def read(self, path: str) -> bytes:
+        entry = self._files.get(path)
+        if entry is None:
+            raise FileNotFoundError(path)
+        if isinstance(entry, bytes):
+            return entry
+        if isinstance(entry, list):
+            return b''.join(entry)
+        with open(entry, 'rb') as f:
+            return f.read()
+
+    def write(self, path: str, data: bytes) -> None:
+        if len(data) <= self.spill_threshold:
+            with self._lock:
+                self._remove(path)
+                self._files[path] = bytes(data)
+            return
+
+        spill_path = self._spill_path()
+        with open(spill_path, 'wb') as f:
+            f.write(data)
+        with self._lock:
+            self._remove(path)
+            self._files[path] = spill_path
+        logging.debug("Spilled %s (%d bytes) to %s", path, len(data), spill_path)
+
+    # Keeps the encoded chunks as they come instead of joining them, spilling to disk once they pass spill_threshold
+    def write_chunks(self, path: str, chunks: Iterable[str]) -> bool:
+        spill_file = None
+        try:
+            encoded_chunks = []
+            size = 0
+            for chunk in chunks:
+                data = chunk.encode('utf-8')
+                if spill_file is not None:
+                    spill_file.write(data)
+                    continue
+                encoded_chunks.append(data)
+                size += len(data)
+                if size > self.spill_threshold:
+                    spill_file = open(self._spill_path(), 'wb')
+                    spill_file.writelines(encoded_chunks)
+                    encoded_chunks = None
+
+            with self._lock:
+                self._remove(path)
+                if spill_file is None:
+                    self._files[path] = encoded_chunks
+                    return True
+                spill_file.close()
+                self._files[path] = spill_file.name
+            logging.debug("Spilled %s to %s", path, spill_file.name)
+            return True
+        except Exception as e:
+            logging.error(f"An error occurred while writing {path}: {e}")
+            if spill_file is not None:
+                spill_file.close()
+                os.remove(spill_file.name)
+            return False
+
+    def _spill_path(self) -> str:
+        with self._lock:
+            if self._spill_dir is None:
+                self._spill_dir = tempfile.mkdtemp(prefix="bg3patcher_")
+            self._spilled += 1
+            return os.path.join(self._spill_dir, f"{self._spilled}.bin")
+
+    def _remove(self, path: str) -> None:
+        entry = self._files.pop(path, None)
+        if isinstance(entry, str) and os.path.exists(entry):
+            os.remove(entry)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._files.clear()
+            if self._spill_dir is not None:
+                shutil.rmtree(self._spill_dir, ignore_errors=True)
+                self._spill_dir = None
@@ -1,30 +1,122 @@
+import os
+import re
+import shutil
 import subprocess
 import logging
-from typing import Literal
+import tempfile
+from typing import Dict, List, Literal, Optional
 from utils.settings_manager import Paths
+from utils.profiler import profiler
+
+
+class LSLibResult:
+    # Outcome of one package in a batched divine command
+    def __init__(self, source_path: str, destination_path: str, success: bool, error: Optional[str] = None):
+        self.source_path = source_path
+        self.destination_path = destination_path
+        self.success = success
+        self.error = error
 
 
 class LSLib:
+    @staticmethod
+    def command(action: str, source_path: str, destination_path: str, *options: str) -> List[str]:
+        return [
+            Paths.DIVINE_FILE,
+            "-g",
+            "bg3",
+            "-a",
+            action,
+            "-c",
+            "lz4",
+            "--source",
+            source_path,
+            "--destination",
+            destination_path,
+            "-l",
+            "off",
+            *options,
+        ]
+
     @staticmethod
     def execute_command(command: Literal["create-package", "extract-package", "convert-resource", "convert-loca"],
-                        source_path: str, destination_path: str) -> None:
+                        source_path: str, destination_path: str) -> bool:
         try:
-            str = [
-                Paths.DIVINE_FILE,
-                "-g",
-                "bg3",
-                "-a",
-                command,
-                "-c",
-                "lz4",
-                "--source",
-                source_path,
-                "--destination",
-                destination_path,
-                "-l",
-                "off",
-            ]
+            str = LSLib.command(command, source_path, destination_path)
+            profiler.count("subprocesses_launched")
             subprocess.run(str, check=True)
+            return True
         except Exception as e:
             logging.error(
                 f"An error occurred while executing the lslib command. Reason: {e}")
+            return False
+
+    # Extracts every package into destination_path/<package name> with one divine process per source folder
+    @staticmethod
+    def extract_packages(pak_paths: List[str], destination_path: str) -> List[LSLibResult]:
+        folders: Dict[str, List[str]] = {}
+        for pak_path in pak_paths:
+            folders.setdefault(os.path.dirname(os.path.abspath(pak_path)), []).append(pak_path)
+
+        results = {}
+        for folder, folder_pak_paths in folders.items():
+            for result in LSLib._extract_folder(folder, folder_pak_paths, destination_path):
+                results[result.source_path] = result
+        return [results[pak_path] for pak_path in pak_paths]
+
+    @staticmethod
+    def _extract_folder(folder: str, pak_paths: List[str], destination_path: str) -> List[LSLibResult]:
+        pak_names = {os.path.basename(pak_path) for pak_path in pak_paths}
+        folder_pak_names = {file_name for file_name in os.listdir(folder) if file_name.lower().endswith(".pak")}
+        with tempfile.TemporaryDirectory(prefix="bg3patcher_") as staging_folder:
+            source_folder = folder
+            if pak_names != folder_pak_names:
+                # divine extracts whole folders, so only the requested packages are linked into a staging folder
+                source_folder = staging_folder
+                for pak_path in pak_paths:
+                    LSLib._link_or_copy(pak_path, os.path.join(staging_folder, os.path.basename(pak_path)))
+
+            error = None
+            try:
+                profiler.count("subprocesses_launched")
+                completed = subprocess.run(
+                    LSLib.command("extract-packages", source_folder, destination_path, "--use-package-name"),
+                    capture_output=True, text=True)
+                if completed.returncode != 0:
+                    error = (completed.stderr or completed.stdout).strip() or f"divine exited with code {completed.returncode}"
+            except Exception as e:
+                error = str(e)
+
+        error_lines = (error or "").splitlines()
+        pak_lines = {pak_path: [line for line in error_lines if LSLib._names_package(line, os.path.basename(pak_path))]
+                     for pak_path in pak_paths}
+        # An error that names none of the packages, e.g. divine failing to start, fails all of them
+        failed_outright = error is not None and not any(pak_lines.values())
+
+        results = []
+        for pak_path in pak_paths:
+            pak_destination = os.path.join(destination_path, os.path.splitext(os.path.basename(pak_path))[0])
+            # A package that failed halfway can leave files behind, so any error naming it fails it
+            extracted = not failed_outright and not pak_lines[pak_path] and LSLib._has_files(pak_destination)
+            pak_error = None
+            if not extracted:
+                # Prefer the lines of divine's output that name this package over the whole output
+                pak_error = '\n'.join(pak_lines[pak_path]) or error or "divine extracted no files from the package"
+            results.append(LSLibResult(pak_path, pak_destination, extracted, pak_error))
+        return results
+
+    # Matches the package's whole file name, so an error about AA.pak isn't taken for one about A.pak
+    @staticmethod
+    def _names_package(line: str, pak_name: str) -> bool:
+        return re.search(rf"(?:^|[\s\"'(\[/\\]){re.escape(pak_name)}(?=$|[\s\"'):,;\]]|\.(?:\s|$))", line, re.IGNORECASE) is not None
+
+    @staticmethod
+    def _has_files(folder: str) -> bool:
+        return any(file_names for _, _, file_names in os.walk(folder))
+
+    @staticmethod
+    def _link_or_copy(source_path: str, destination_path: str) -> None:
+        try:
+            os.link(source_path, destination_path)
+        except OSError:
+            shutil.copyfile(source_path, destination_path)
@@ -0,0 +1,221 @@
+import os
+import struct
+import zlib
+import logging
+import lz4.block
+from utils.profiler import profiler
+from typing import Dict, List, Union
+
+
+class LSPKError(Exception):
+    pass
+
+
+class LSPKEntry:
+    # Compression method is stored in the low nibble of the entry flags
+    COMPRESSION_NONE = 0
+    COMPRESSION_ZLIB = 1
+    COMPRESSION_LZ4 = 2
+
+    def __init__(self, name: str, offset: int, size_on_disk: int, uncompressed_size: int, archive_part: int, flags: int):
+        self.name = name
+        self.offset = offset
+        self.size_on_disk = size_on_disk
+        self.uncompressed_size = uncompressed_size
+        self.archive_part = archive_part
+        self.flags = flags
+
+    @property
+    def compression(self) -> int:
+        return self.flags & 0x0F
+
+    @property
+    def file_name(self) -> str:
+        return self.name.rsplit('/', 1)[-1]
+
+
+class LSPKReader:
+    SIGNATURE = b'LSPK'
+    SUPPORTED_VERSIONS = (15, 16, 17, 18)
+    FLAG_SOLID = 0x04
+
+    HEADER_15 = struct.Struct('<IQIBB16s')
+    HEADER_16 = struct.Struct('<IQIBB16sH')
+    ENTRY_15 = struct.Struct('<256sQQQIIII')
+    ENTRY_18 = struct.Struct('<256sIHBBII')
+
+    def __init__(self, pak_path: str):
+        self.pak_path = pak_path
+        self.entries: Dict[str, LSPKEntry] = {}
+        self._parts = {}
+        self._file = open(pak_path, 'rb')
+        try:
+            self._parts[0] = self._file
+            self._read_header()
+            self._read_file_list()
+        except Exception:
+            self.close()
+            raise
+
+    def __enter__(self) -> 'LSPKReader':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def close(self) -> None:
+        for part in self._parts.values():
+            part.close()
+        self._parts.clear()
+
+    def _read_header(self) -> None:
+        if self._file.read(4) != LSPKReader.SIGNATURE:
+            raise LSPKError(f"{self.pak_path} is not an LSPK package")
+
+        version = struct.unpack('<I', self._file.read(4))[0]
+        if version not in LSPKReader.SUPPORTED_VERSIONS:
+            raise LSPKError(f"Unsupported LSPK version {version}")
+
+        self._file.seek(4)
+        header_struct = LSPKReader.HEADER_15 if version == 15 else LSPKReader.HEADER_16
+        header = header_struct.unpack(self._file.read(header_struct.size))
+        self.version = version
+        self.file_list_offset = header[1]
+        self.file_list_size = header[2]
+        self.flags = header[3]
+        self.priority = header[4]
+        self.num_parts = header[6] if version > 15 else 1
+
+        if self.flags & LSPKReader.FLAG_SOLID:
+            raise LSPKError("Solid packages are not supported")
+
+    def _read_file_list(self) -> None:
+        self._file.seek(self.file_list_offset)
+        num_files, compressed_size = struct.unpack('<ii', self._file.read(8))
+        entry_struct = LSPKReader.ENTRY_15 if self.version < 17 else LSPKReader.ENTRY_18
+        file_list = lz4.block.decompress(self._file.read(compressed_size), uncompressed_size=num_files * entry_struct.size)
+
+        for values in entry_struct.iter_unpack(file_list):
+            name = values[0].split(b'\0', 1)[0].decode('utf-8')
+            if entry_struct is LSPKReader.ENTRY_15:
+                entry = LSPKEntry(name, values[1], values[2], values[3], values[4], values[5])
+            else:
+                entry = LSPKEntry(name, values[1] | (values[2] << 32), values[5], values[6], values[3], values[4])
+            self.entries[name] = entry
+
+    def _part_file(self, archive_part: int):
+        if archive_part not in self._parts:
+            base_path, extension = os.path.splitext(self.pak_path)
+            self._parts[archive_part] = open(f"{base_path}_{archive_part}{extension}", 'rb')
+        return self._parts[archive_part]
+
+    # Reads and decompresses a single file from the package
+    def read(self, name: str) -> bytes:
+        entry = self.entries.get(name)
+        if entry is None:
+            raise LSPKError(f"{name} not found in {self.pak_path}")
+
+        part = self._part_file(entry.archive_part)
+        part.seek(entry.offset)
+        data = part.read(entry.size_on_disk)
+        profiler.count("bytes_read", len(data))
+
+        if entry.compression == LSPKEntry.COMPRESSION_NONE or entry.uncompressed_size == 0:
+            return data
+        if entry.compression == LSPKEntry.COMPRESSION_ZLIB:
+            return zlib.decompress(data)
+        if entry.compression == LSPKEntry.COMPRESSION_LZ4:
+            return lz4.block.decompress(data, uncompressed_size=entry.uncompressed_size)
+        raise LSPKError(f"Unsupported compression method {entry.compression} for {name}")
+
+    # Lists every path of the files with the specified names, sorted like the paths of an extracted package
+    def find_all_files(self, target_filenames: List[str]) -> Dict[str, List[str]]:
+        found_files = {}
+        for name, entry in self.entries.items():
+            if entry.file_name in target_filenames:
+                found_files.setdefault(entry.file_name, []).append(name)
+        return {file_name: sorted(names, key=lambda name: name.replace('/', os.sep)) for file_name, names in found_files.items()}
+
+    # Picks one path per file name, the same one ModManager.read_unpacked_mod picks once the package is extracted
+    def find_files(self, target_filenames: List[str]) -> Dict[str, str]:
+        found_files = {}
+        for file_name, names in self.find_all_files(target_filenames).items():
+            if len(names) > 1:
+                logging.warning(f"Found {len(names)} {file_name} files in {self.pak_path}, using {names[0]}")
+            found_files[file_name] = names[0]
+        return found_files
+
+    # Reads the files with the specified names without extracting the rest of the package
+    def read_files(self, target_filenames: List[str]) -> Dict[str, bytes]:
+        files = {}
+        for file_name, name in self.find_files(target_filenames).items():
+            files[file_name] = self.read(name)
+            logging.debug("Read %s from %s", name, self.pak_path)
+        return files
+
+
+class LSPKWriter:
+    VERSION = 18
+    # LZ4 with the default compression level flag, as written by divine
+    LZ4_FLAGS = LSPKEntry.COMPRESSION_LZ4 | 0x20
+
+    def __init__(self, pak_path: str, priority: int = 0):
+        self.pak_path = pak_path
+        self.priority = priority
+        self._entries = []
+        # Write to a temporary file so a failed build never leaves a broken package behind
+        self._temp_path = pak_path + ".tmp"
+        self._file = open(self._temp_path, 'wb')
+        self._file.write(LSPKReader.SIGNATURE + b'\0' * LSPKReader.HEADER_16.size)
+
+    def __enter__(self) -> 'LSPKWriter':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    # data can be any bytes-like object, e.g. a memoryview of the buffer the file was written to
+    def add_file(self, name: str, data: Union[bytes, memoryview]) -> None:
+        encoded_name = name.replace('\\', '/').encode('utf-8')
+        if len(encoded_name) >= 256:
+            raise LSPKError(f"File name {name} is too long")
+
+        if data:
+            stored_data = lz4.block.compress(data, store_size=False)
+            flags, uncompressed_size = LSPKWriter.LZ4_FLAGS, len(data)
+        else:
+            stored_data = data
+            flags, uncompressed_size = LSPKEntry.COMPRESSION_NONE, 0
+
+        offset = self._file.tell()
+        self._file.write(stored_data)
+        self._entries.append(LSPKReader.ENTRY_18.pack(
+            encoded_name, offset & 0xFFFFFFFF, offset >> 32, 0, flags, len(stored_data), uncompressed_size))
+
+    def close(self) -> None:
+        file_list = lz4.block.compress(b''.join(self._entries), store_size=False)
+        file_list_offset = self._file.tell()
+        self._file.write(struct.pack('<ii', len(self._entries), len(file_list)))
+        self._file.write(file_list)
+        file_list_size = self._file.tell() - file_list_offset
+
+        self._file.seek(len(LSPKReader.SIGNATURE))
+        self._file.write(LSPKReader.HEADER_16.pack(
+            LSPKWriter.VERSION, file_list_offset, file_list_size, 0, self.priority, b'\0' * 16, 1))
+        self._file.close()
+        os.replace(self._temp_path, self.pak_path)
+
+    def abort(self) -> None:
+        self._file.close()
+        if os.path.exists(self._temp_path):
+            os.remove(self._temp_path)
+
+    # Writes a package containing the specified {virtual_path: content} files in one pass
+    @staticmethod
+    def write_package(pak_path: str, files: Dict[str, Union[bytes, memoryview]], priority: int = 0) -> None:
+        with LSPKWriter(pak_path, priority) as writer:
+            for name, data in files.items():
+                writer.add_file(name, data)
@@ -0,0 +1,98 @@
+import os
+import json
+import hashlib
+from typing import Dict, List, Set
+from model.mod import Mod
+from model.progression import Progression
+from utils.file_manager import FileManager
+from utils.model_cache import ModelCache
+from utils.settings_manager import Paths
+
+
+class MergeState:
+    # Bump when the merge rules change, parser changes are caught by ModelCache.schema_version
+    VERSION = 3
+
+    def __init__(self, state_file: str = None):
+        self.state_file = state_file or Paths.MERGE_STATE_FILE
+        state = FileManager.load_object_from_json(None, self.state_file) if os.path.exists(self.state_file) else {}
+        if state.get("version") != MergeState.VERSION or state.get("schema") != ModelCache.schema_version():
+            state = {}
+        # Mod keys in the load order of the last merge
+        self.mod_order: List[str] = state.get("mod_order", [])
+        # Mod key -> {"fingerprint": str, "uuids": [progression UUID, ...]}
+        self.contributions: Dict[str, dict] = state.get("contributions", {})
+        # Progression UUID -> merged progression dict
+        self.merged: Dict[str, dict] = state.get("merged", {})
+        # Progression UUID -> merged progression, built from merged on first use and kept while the state lives
+        self._progressions: Dict[str, Progression] = {}
+
+    @staticmethod
+    def mod_keys(mods: List[Mod]) -> List[str]:
+        keys = []
+        seen_keys = set()
+        for index, mod in enumerate(mods):
+            key = mod.uuid if mod.uuid not in seen_keys else f"{mod.uuid}#{index}"
+            seen_keys.add(key)
+            keys.append(key)
+        return keys
+
+    # Mods loaded through load_mods carry the hash of their files, others are hashed from their progressions
+    @staticmethod
+    def fingerprint(mod: Mod) -> str:
+        if mod.fingerprint:
+            return mod.fingerprint
+        progressions = [progression.to_dict() for progression in mod.progressions]
+        return hashlib.sha256(json.dumps(progressions, sort_keys=True).encode('utf-8')).hexdigest()
+
+    # Returns the keys of the mods that were added, changed or removed since the last merge
+    def changed_mods(self, mod_order: List[str], fingerprints: Dict[str, str]) -> List[str]:
+        changed = [key for key in mod_order if self.contributions.get(key, {}).get("fingerprint") != fingerprints[key]]
+        return changed + [key for key in self.contributions if key not in fingerprints]
+
+    # Returns the UUIDs of every progression touched by a mod that changed, was added or was removed
+    def affected_progressions(self, mod_order: List[str], mods: Dict[str, Mod], changed_mods: List[str]) -> Set[str]:
+        kept_mods = [key for key in self.mod_order if key in mods]
+        if kept_mods != [key for key in mod_order if key in self.contributions]:
+            # The load order changed, so every merge result may differ
+            return {p.uuid for mod in mods.values() for p in mod.progressions} | set(self.merged)
+
+        affected = set()
+        for key in changed_mods:
+            if key in self.contributions:
+                affected.update(self.contributions[key]["uuids"])
+            if key in mods:
+                affected.update(p.uuid for p in mods[key].progressions)
+        return affected
+
+    def update(self, mod_order: List[str], mods: Dict[str, Mod], fingerprints: Dict[str, str], changed_mods: List[str]) -> None:
+        for key in changed_mods:
+            if key in mods:
+                self.contributions[key] = {"fingerprint": fingerprints[key], "uuids": [p.uuid for p in mods[key].progressions]}
+            else:
+                del self.contributions[key]
+        self.mod_order = mod_order
+
+    def set_merged(self, uuid: str, progression: Progression = None) -> None:
+        if progression is None:
+            self.merged.pop(uuid, None)
+            self._progressions.pop(uuid, None)
+        else:
+            self.merged[uuid] = progression.to_dict()
+            self._progressions[uuid] = progression
+
+    def progression(self, uuid: str) -> Progression:
+        progression = self._progressions.get(uuid)
+        if progression is None:
+            progression = self._progressions[uuid] = Progression.from_dict(self.merged[uuid])
+        return progression
+
+    def save(self) -> None:
+        FileManager.create_folder(os.path.dirname(self.state_file))
+        FileManager.save_object_to_json({
+            "version": MergeState.VERSION,
+            "schema": ModelCache.schema_version(),
+            "mod_order": self.mod_order,
+            "contributions": self.contributions,
+            "merged": self.merged,
+        }, self.state_file)
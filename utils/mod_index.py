@@ -0,0 +1,214 @@
+import os
+import sys
+import json
+import hashlib
+import sqlite3
+import logging
+import argparse
+from typing import Dict, List, Tuple
+from model.mod import Mod
+from model.progression import Progression
+from utils.file_manager import FileManager
+from utils.settings_manager import Paths
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS mods (
+    id INTEGER PRIMARY KEY,
+    uuid TEXT NOT NULL,
+    folder TEXT NOT NULL,
+    name TEXT,
+    author TEXT,
+    fingerprint TEXT NOT NULL,
+    load_order INTEGER NOT NULL,
+    UNIQUE (uuid, folder)
+);
+CREATE TABLE IF NOT EXISTS progressions (
+    id INTEGER PRIMARY KEY,
+    mod_id INTEGER NOT NULL REFERENCES mods (id) ON DELETE CASCADE,
+    uuid TEXT NOT NULL,
+    name TEXT,
+    table_uuid TEXT,
+    level INTEGER,
+    allow_improvement INTEGER,
+    is_multiclass INTEGER
+);
+CREATE TABLE IF NOT EXISTS progression_values (
+    progression_id INTEGER NOT NULL REFERENCES progressions (id) ON DELETE CASCADE,
+    attribute TEXT NOT NULL,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS progression_subclasses (
+    progression_id INTEGER NOT NULL REFERENCES progressions (id) ON DELETE CASCADE,
+    subclass_uuid TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS class_descriptions (
+    mod_id INTEGER NOT NULL REFERENCES mods (id) ON DELETE CASCADE,
+    uuid TEXT NOT NULL,
+    name TEXT,
+    parent_guid TEXT
+);
+CREATE INDEX IF NOT EXISTS progressions_mod ON progressions (mod_id);
+CREATE INDEX IF NOT EXISTS progressions_uuid ON progressions (uuid);
+CREATE INDEX IF NOT EXISTS progressions_table_level ON progressions (table_uuid, level);
+CREATE INDEX IF NOT EXISTS progressions_name ON progressions (name);
+CREATE INDEX IF NOT EXISTS progression_values_progression ON progression_values (progression_id);
+CREATE INDEX IF NOT EXISTS progression_values_value ON progression_values (attribute, value);
+CREATE INDEX IF NOT EXISTS progression_subclasses_progression ON progression_subclasses (progression_id);
+CREATE INDEX IF NOT EXISTS progression_subclasses_uuid ON progression_subclasses (subclass_uuid);
+CREATE INDEX IF NOT EXISTS class_descriptions_mod ON class_descriptions (mod_id);
+CREATE INDEX IF NOT EXISTS class_descriptions_uuid ON class_descriptions (uuid);
+"""
+
+# Progression list attribute -> name of the attribute in Progressions.lsx
+VALUE_ATTRIBUTES = {
+    'boosts': 'Boosts',
+    'passives_added': 'PassivesAdded',
+    'passives_removed': 'PassivesRemoved',
+    'selectors': 'Selectors',
+}
+
+
+class ModIndex:
+    # SQLite index of the installed mods' progressions, values, subclasses and class descriptions
+    def __init__(self, index_file: str = None):
+        self.index_file = index_file or Paths.MOD_INDEX_FILE
+        FileManager.create_folder(os.path.dirname(os.path.abspath(self.index_file)))
+        self.connection = sqlite3.connect(self.index_file)
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        self.connection.executescript(SCHEMA)
+
+    def __enter__(self) -> 'ModIndex':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.connection.close()
+
+    @staticmethod
+    def fingerprint(mod: Mod) -> str:
+        if mod.fingerprint:
+            return mod.fingerprint
+        return hashlib.sha256(json.dumps(mod.to_dict(), sort_keys=True).encode('utf-8')).hexdigest()
+
+    # Brings the index in line with the mods, rewriting only the ones whose fingerprint changed
+    def update(self, mods: List[Mod]) -> Tuple[int, int]:
+        with self.connection:
+            indexed = {(uuid, folder): (mod_id, fingerprint)
+                       for mod_id, uuid, folder, fingerprint in self.connection.execute("SELECT id, uuid, folder, fingerprint FROM mods")}
+            seen = set()
+            updated = 0
+            for load_order, mod in enumerate(mods):
+                key = (mod.uuid, mod.folder)
+                if key in seen:
+                    continue
+                seen.add(key)
+                fingerprint = ModIndex.fingerprint(mod)
+                mod_id, indexed_fingerprint = indexed.get(key, (None, None))
+                if indexed_fingerprint == fingerprint:
+                    self.connection.execute("UPDATE mods SET load_order = ? WHERE id = ?", (load_order, mod_id))
+                    continue
+                if mod_id is not None:
+                    self.connection.execute("DELETE FROM mods WHERE id = ?", (mod_id,))
+                self._insert_mod(mod, fingerprint, load_order)
+                updated += 1
+
+            removed = [(mod_id,) for key, (mod_id, _) in indexed.items() if key not in seen]
+            self.connection.executemany("DELETE FROM mods WHERE id = ?", removed)
+        logging.info(f"Mod index updated ({updated} mods indexed, {len(removed)} removed)")
+        return updated, len(removed)
+
+    def _insert_mod(self, mod: Mod, fingerprint: str, load_order: int) -> None:
+        mod_id = self.connection.execute(
+            "INSERT INTO mods (uuid, folder, name, author, fingerprint, load_order) VALUES (?, ?, ?, ?, ?, ?)",
+            (mod.uuid, mod.folder, mod.name, mod.author, fingerprint, load_order)).lastrowid
+
+        progression: Progression
+        for progression in mod.progressions or []:
+            progression_id = self.connection.execute(
+                "INSERT INTO progressions (mod_id, uuid, name, table_uuid, level, allow_improvement, is_multiclass) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (mod_id, progression.uuid, progression.name, progression.table_uuid, progression.level,
+                 progression.allow_improvement, progression.is_multiclass)).lastrowid
+            self.connection.executemany(
+                "INSERT INTO progression_values (progression_id, attribute, value) VALUES (?, ?, ?)",
+                [(progression_id, attribute_id, value)
+                 for attribute, attribute_id in VALUE_ATTRIBUTES.items() for value in getattr(progression, attribute)])
+            self.connection.executemany(
+                "INSERT INTO progression_subclasses (progression_id, subclass_uuid) VALUES (?, ?)",
+                [(progression_id, subclass.uuid) for subclass in progression.subclasses])
+
+        self.connection.executemany(
+            "INSERT INTO class_descriptions (mod_id, uuid, name, parent_guid) VALUES (?, ?, ?, ?)",
+            [(mod_id, c.uuid, c.name, c.parent_guid) for c in mod.class_descriptions or []])
+
+    def mods(self) -> List[Dict]:
+        return self._query(
+            "SELECT name, uuid, folder, author, "
+            "(SELECT COUNT(*) FROM progressions WHERE mod_id = mods.id) AS progressions "
+            "FROM mods ORDER BY load_order")
+
+    # Mods that edit the progression with this UUID
+    def mods_touching_progression(self, progression_uuid: str) -> List[Dict]:
+        return self._query(
+            "SELECT mods.name AS mod, mods.uuid AS mod_uuid, progressions.name, progressions.table_uuid, progressions.level "
+            "FROM progressions JOIN mods ON mods.id = progressions.mod_id "
+            "WHERE progressions.uuid = ? ORDER BY mods.load_order", (progression_uuid,))
+
+    # TableUUID/Level pairs that more than one mod defines progressions for
+    def overridden_levels(self) -> List[Dict]:
+        return self._query(
+            "SELECT progressions.table_uuid, progressions.level, COUNT(DISTINCT progressions.mod_id) AS mod_count, "
+            "GROUP_CONCAT(DISTINCT mods.name) AS mods "
+            "FROM progressions JOIN mods ON mods.id = progressions.mod_id "
+            "GROUP BY progressions.table_uuid, progressions.level HAVING mod_count > 1 "
+            "ORDER BY mod_count DESC, progressions.table_uuid, progressions.level")
+
+    # Subclasses that mods add to the progressions of a class, e.g. Wizard
+    def subclasses_for_class(self, class_name: str) -> List[Dict]:
+        return self._query(
+            "SELECT DISTINCT mods.name AS mod, progression_subclasses.subclass_uuid, "
+            "(SELECT name FROM class_descriptions WHERE class_descriptions.uuid = progression_subclasses.subclass_uuid LIMIT 1) AS subclass "
+            "FROM progressions "
+            "JOIN mods ON mods.id = progressions.mod_id "
+            "JOIN progression_subclasses ON progression_subclasses.progression_id = progressions.id "
+            "WHERE progressions.name = ? ORDER BY mods.load_order", (class_name,))
+
+    def _query(self, sql: str, parameters: tuple = ()) -> List[Dict]:
+        cursor = self.connection.execute(sql, parameters)
+        columns = [column[0] for column in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the index of installed mods")
+    parser.add_argument("--index", help="Index file to query, defaults to Paths.MOD_INDEX_FILE")
+    subparsers = parser.add_subparsers(dest="query", required=True)
+    subparsers.add_parser("mods", help="List the indexed mods in load order")
+    touches_parser = subparsers.add_parser("touches", help="List the mods that edit a progression")
+    touches_parser.add_argument("progression_uuid")
+    subparsers.add_parser("overrides", help="List TableUUID/Level pairs defined by more than one mod")
+    subclasses_parser = subparsers.add_parser("subclasses", help="List the subclasses mods add to a class")
+    subclasses_parser.add_argument("class_name")
+    args = parser.parse_args()
+
+    with ModIndex(args.index) as index:
+        if args.query == "mods":
+            rows = index.mods()
+        elif args.query == "touches":
+            rows = index.mods_touching_progression(args.progression_uuid)
+        elif args.query == "overrides":
+            rows = index.overridden_levels()
+        else:
+            rows = index.subclasses_for_class(args.class_name)
+
+    if rows:
+        print('\t'.join(rows[0]))
+    for row in rows:
+        print('\t'.join('' if value is None else str(value) for value in row.values()))
+    if not rows:
+        print("No results", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,18 +1,38 @@
 
+import io
 import os
+import hashlib
 import logging
-from typing import List
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Dict, List, Optional, Set, Union
 from lxml import etree
 from model.mod import Mod
 from utils.file_manager import FileManager
 from utils.settings_manager import Paths
 from utils.lslib import LSLib
+from utils.lspk import LSPKReader, LSPKWriter, LSPKError
+from utils.extraction_cache import ExtractionCache
+from utils.merge_state import MergeState
+from utils.conflict_index import ConflictIndex
+from utils.model_cache import ModelCache
+from utils.xml_edit_session import XmlEditSession
 from model.progression import Progression
-from model.icon import Icon
+from model.boost import Boost, parse_boost
+from model.icon import Icon, IconNameIndex
+from utils.profiler import profiler
+from utils.file_system import DiskFileSystem, MemoryFileSystem
 
 
 class ModManager:
     ImprovedUI_Assets = False
+    MOD_FILES = Mod.MOD_FILES
+    # Files that later stages edit, kept by their path in the package and staged into file_system
+    STAGED_FILES = ['IUI_ClassIcons.xaml']
+    # Where the patch tree and staged mod files live, replaced by a MemoryFileSystem for in-memory runs
+    file_system: Union[DiskFileSystem, MemoryFileSystem] = DiskFileSystem()
+    WORKERS = os.cpu_count() or 1
 
     @staticmethod
     def get_mod_list():
@@ -20,7 +40,8 @@ class ModManager:
         mods_directory = Paths.MOD_LIST_DIR
 
         try:
-            for filename in os.listdir(mods_directory):
+            # os.listdir order depends on the file system, sorting keeps runs reproducible
+            for filename in sorted(os.listdir(mods_directory), key=str.lower):
                 if filename.endswith(".pak"):
                     if filename == "FFTCompatibilityPatch.pak":
                         continue
@@ -30,81 +51,240 @@ class ModManager:
 
         return lstMods
 
+    # Module UUIDs in the order the game loads them, from ModOrder or the Mods list when ModOrder is missing
     @staticmethod
-    def unpack_mods() -> List[str]:
+    def get_load_order(modsettings_path: str = None) -> List[str]:
+        try:
+            if modsettings_path is None:
+                modsettings_path = FileManager.find_files(Paths.GAME_DATA_DIR, ["modsettings.lsx"]).get("modsettings.lsx")
+            if modsettings_path is None:
+                return []
+            root = etree.parse(modsettings_path).getroot()
+            load_order = root.xpath("//node[@id='ModOrder']/children/node[@id='Module']/attribute[@id='UUID']/@value")
+            if not load_order:
+                load_order = root.xpath("//node[@id='Mods']/children/node[@id='ModuleShortDesc']/attribute[@id='UUID']/@value")
+            return [str(uuid) for uuid in load_order]
+        except Exception as e:
+            logging.error(f"An error occurred while reading the load order: {e}")
+            return []
+
+    # Mods missing from the load order keep their relative order after the ordered ones
+    @staticmethod
+    def sort_by_load_order(mods: List[Mod], load_order: List[str] = None) -> List[Mod]:
+        if load_order is None:
+            load_order = ModManager.get_load_order()
+        positions = {uuid: index for index, uuid in enumerate(load_order)}
+        return sorted(mods, key=lambda mod: positions.get(mod.uuid, len(positions)))
+
+    @staticmethod
+    def unpack_mods(workers: int = None, batch: bool = False) -> List[str]:
         try:
             logging.info("Unpacking mods...")
-            unpacked_mods = []
             FileManager.create_folder(Paths.TEMP_DIR)
             FileManager.clean_folder(Paths.TEMP_DIR)
-            for mod in ModManager.get_mod_list():
-                source_path = os.path.join(Paths.MOD_LIST_DIR, mod)
-                dest_path = os.path.join(Paths.TEMP_DIR, mod[:-4])
+            mods = ModManager.get_mod_list()
+            if batch:
+                # One divine process for the whole mod list instead of one per package
+                pak_paths = [os.path.join(Paths.MOD_LIST_DIR, mod) for mod in mods]
+                results = []
+                for mod, result in zip(mods, LSLib.extract_packages(pak_paths, Paths.TEMP_DIR)):
+                    if not result.success:
+                        logging.debug("divine failed to extract %s: %s", mod, result.error)
+                    results.append(result.destination_path if result.success else None)
+            else:
+                with ThreadPoolExecutor(max_workers=workers or ModManager.WORKERS) as executor:
+                    results = list(executor.map(ModManager.unpack_mod, mods))
 
-                LSLib.execute_command("extract-package", source_path, dest_path)
-                unpacked_mods.append(dest_path)
-            logging.info("Mods unpacked successfully")
+            unpacked_mods = [dest_path for dest_path in results if dest_path is not None]
+            failed_mods = [mod for mod, dest_path in zip(mods, results) if dest_path is None]
             for mod in unpacked_mods:
-                logging.debug(f"Unpacked mod: {mod}")
+                logging.debug("Unpacked mod: %s", mod)
+            for mod in failed_mods:
+                logging.warning(f"Failed to unpack {mod}. Skipping...")
+            logging.info(f"Mods unpacked successfully ({len(unpacked_mods)} unpacked, {len(failed_mods)} failed)")
             return unpacked_mods
         except Exception as e:
             logging.error(f"An error occurred while unpacking mods: {e}")
 
     @staticmethod
-    def get_mods_list(unpacked_mods: List[str]) -> List[Mod]:
-        
+    def unpack_mod(mod: str) -> Optional[str]:
+        source_path = os.path.join(Paths.MOD_LIST_DIR, mod)
+        dest_path = os.path.join(Paths.TEMP_DIR, mod[:-4])
+        with profiler.stage(f"unpack_mod:{mod[:-4]}"):
+            if LSLib.execute_command("extract-package", source_path, dest_path):
+                return dest_path
+        return None
+
+    @staticmethod
+    def read_mods(workers: int = None, cache: ExtractionCache = None) -> Dict[str, Dict[str, bytes]]:
+        try:
+            logging.info("Reading mods...")
+            ModManager.file_system.clear()
+            mods = ModManager.get_mod_list()
+            pak_paths = [os.path.join(Paths.MOD_LIST_DIR, mod) for mod in mods]
+            # Packages the native reader can't open are collected and extracted with a single divine call
+            unreadable_paks = []
+            with ThreadPoolExecutor(max_workers=workers or ModManager.WORKERS) as executor:
+                results = list(executor.map(lambda pak_path: ModManager.read_mod(pak_path, cache, unreadable_paks), pak_paths))
+            if unreadable_paks:
+                extracted_files = ModManager.extract_mods_with_divine(unreadable_paks, cache)
+                results = [extracted_files.get(pak_path) if files is None else files for pak_path, files in zip(pak_paths, results)]
+            if cache is not None:
+                cache.save()
+
+            mod_files = {}
+            for mod, files in zip(mods, results):
+                if files is None:
+                    logging.warning(f"Failed to read {mod}. Skipping...")
+                else:
+                    mod_files[mod[:-4]] = files
+                    ModManager.stage_files(mod[:-4], files)
+            logging.info("Mods read successfully")
+            return mod_files
+        except Exception as e:
+            logging.error(f"An error occurred while reading mods: {e}")
+
+    # With unreadable_paks, packages the native reader can't open are added to it instead of extracted one by one
+    @staticmethod
+    def read_mod(pak_path: str, cache: ExtractionCache = None, unreadable_paks: List[str] = None) -> Optional[Dict[str, bytes]]:
+        mod_name = os.path.basename(pak_path)[:-4]
+        try:
+            with profiler.stage(f"read_mod:{mod_name}"):
+                if cache is not None:
+                    digest = cache.fingerprint(pak_path)
+                    files = cache.get(digest)
+                    if files is not None:
+                        logging.debug("Using cached files for %s", mod_name)
+                        return files
+
+                files = ModManager.extract_mod_files(pak_path, unreadable_paks)
+                if cache is not None and files is not None:
+                    cache.put(digest, files)
+                return files
+        except Exception as e:
+            logging.error(f"An error occurred while reading {mod_name}: {e}")
+
+    @staticmethod
+    def extract_mod_files(pak_path: str, unreadable_paks: List[str] = None) -> Optional[Dict[str, bytes]]:
+        mod_name = os.path.basename(pak_path)[:-4]
+        try:
+            with LSPKReader(pak_path) as reader:
+                files = reader.read_files(ModManager.MOD_FILES)
+                for names in reader.find_all_files(ModManager.STAGED_FILES).values():
+                    for name in names:
+                        files[name] = reader.read(name)
+                return files
+        except LSPKError as e:
+            if unreadable_paks is not None:
+                logging.debug("%s can't be read natively (%s)", mod_name, e)
+                unreadable_paks.append(pak_path)
+                return None
+            logging.warning(f"{mod_name} can't be read natively ({e}). Extracting with divine...")
+            # Extracted outside of file_system, only the files that are needed are kept
+            with tempfile.TemporaryDirectory(prefix="bg3patcher_") as temp_dir:
+                dest_path = os.path.join(temp_dir, mod_name)
+                if not LSLib.execute_command("extract-package", pak_path, dest_path):
+                    return None
+                return ModManager.read_unpacked_mod(dest_path)
+
+    # Extracts every package with one divine process, returns {pak path: files} for the ones that were extracted
+    @staticmethod
+    def extract_mods_with_divine(pak_paths: List[str], cache: ExtractionCache = None) -> Dict[str, Dict[str, bytes]]:
+        logging.warning(f"{len(pak_paths)} mods can't be read natively. Extracting them with divine...")
+        extracted_files = {}
+        with tempfile.TemporaryDirectory(prefix="bg3patcher_") as temp_dir:
+            for result in LSLib.extract_packages(pak_paths, temp_dir):
+                if not result.success:
+                    logging.warning(f"divine failed to extract {os.path.basename(result.source_path)}: {result.error}")
+                    continue
+                files = ModManager.read_unpacked_mod(result.destination_path)
+                if cache is not None:
+                    cache.put(cache.fingerprint(result.source_path), files)
+                extracted_files[result.source_path] = files
+        return extracted_files
+
+    @staticmethod
+    def read_unpacked_mod(unpacked_mod: str) -> Dict[str, bytes]:
+        files = {}
+        file_index = FileManager.index_files(unpacked_mod)
+        for file_name in ModManager.MOD_FILES:
+            file_paths = sorted(file_index.get(file_name, []))
+            if not file_paths:
+                continue
+            if len(file_paths) > 1:
+                logging.warning(f"Found {len(file_paths)} {file_name} files in {unpacked_mod}, using {file_paths[0]}")
+            with open(file_paths[0], 'rb') as f:
+                files[file_name] = f.read()
+            profiler.count("bytes_read", len(files[file_name]))
+        for file_name in ModManager.STAGED_FILES:
+            for file_path in file_index.get(file_name, []):
+                with open(file_path, 'rb') as f:
+                    files[os.path.relpath(file_path, unpacked_mod).replace(os.sep, '/')] = f.read()
+        return files
+
+    # Writes the staged files read from a mod into file_system under the mod's folder
+    @staticmethod
+    def stage_files(mod_name: str, files: Dict[str, bytes]) -> None:
+        for name, content in files.items():
+            if '/' in name:
+                ModManager.file_system.write(f"{mod_name}/{name}", content)
+
+    @staticmethod
+    def get_mods_list(unpacked_mods: List[str], model_cache: ModelCache = None) -> List[Mod]:
+        mod_files = {unpacked_mod: ModManager.read_unpacked_mod(unpacked_mod) for unpacked_mod in unpacked_mods}
+        return ModManager.load_mods(mod_files, model_cache)
+
+    @staticmethod
+    def load_mods(mod_files: Dict[str, Dict[str, bytes]], model_cache: ModelCache = None) -> List[Mod]:
         mods = []
-        for unpacked_mod in unpacked_mods:
+        for unpacked_mod, files in mod_files.items():
             unpacked_mod_folder = os.path.basename(os.path.normpath(unpacked_mod))
             if unpacked_mod_folder == "FFTCompatibilityPatch":
                 continue
             if unpacked_mod_folder == "ImprovedUI Assets":
                 ModManager.ImprovedUI_Assets = True
-            meta_file = FileManager.find_files(unpacked_mod, ['meta.lsx'])
-            class_descriptions_file = FileManager.find_files(unpacked_mod, ['ClassDescriptions.lsx'])
-            progression_file = FileManager.find_files(unpacked_mod, ['Progressions.lsx'])
-
-            if meta_file:
-                meta_string = FileManager.xml_to_string(meta_file['meta.lsx'])
-                meta_string = meta_string.replace('<?xml version="1.0" encoding="UTF-8"?>', '')
-                if class_descriptions_file:
-                    class_descriptions_string = FileManager.xml_to_string(class_descriptions_file['ClassDescriptions.lsx'])
-                    class_descriptions_string = class_descriptions_string.replace('<?xml version="1.0" encoding="UTF-8"?>', '')
-
-                    if progression_file:
-                        progression_string = FileManager.xml_to_string(progression_file['Progressions.lsx'])
-                        progression_string = progression_string.replace('<?xml version="1.0" encoding="UTF-8"?>', '')
-
-                        # Create the Mod object here, within the innermost if block
-                        mod = Mod(unpacked_mod, meta_string, class_descriptions_string, progression_string)
-                        # ModManager.load_icons(mod, unpacked_mod)
-                        mods.append(mod)
+
+            if 'meta.lsx' in files and 'ClassDescriptions.lsx' in files and 'Progressions.lsx' in files:
+                with profiler.stage(f"load_mod:{unpacked_mod_folder}"):
+                    fingerprint = ModelCache.key(files)
+                    mod = model_cache.get(fingerprint, unpacked_mod) if model_cache is not None else None
+                    if mod is None:
+                        mod = Mod(unpacked_mod, files['meta.lsx'], files['ClassDescriptions.lsx'], files['Progressions.lsx'])
+                        if model_cache is not None:
+                            model_cache.put(fingerprint, mod)
+                    mod.fingerprint = fingerprint
+                # ModManager.load_icons(mod, unpacked_mod)
+                mods.append(mod)
         return mods
 
     @staticmethod
     def load_icons(mod: Mod, unpacked_mod: str):
         try:
-            icon_folder = FileManager.find_folders(unpacked_mod, ['ClassIcons'])
-            icon_names = FileManager.get_file_names(icon_folder['ClassIcons'], 'DDS')
+            icon_folder = FileManager.find_folders(unpacked_mod, ['ClassIcons'])['ClassIcons']
+            icon_index = ModManager.icon_index(icon_folder, os.stat(icon_folder).st_mtime_ns)
             icon: Icon
             for icon in mod.icons:
-                icon.set_icon_name(icon_names)
+                icon.set_icon_name(icon_index)
                 # logging.debug(f"Icon: {icon.icon_name} - {icon.icon_type}")
             # logging.info(f"Loaded {len(mod.icons)} icons for {mod.name}")
         except Exception as e:
             logging.error(f"An error occurred while loading icons for {mod.name}: {e}")
 
+    # Keyed by the folder's mtime as well, which changes whenever an icon is added, removed or renamed
+    @staticmethod
+    @lru_cache(maxsize=64)
+    def icon_index(icon_folder: str, mtime: int) -> IconNameIndex:
+        return IconNameIndex(FileManager.get_file_names(icon_folder, 'DDS'))
+
     @staticmethod
-    def select_progression_mods(mod_list: List[Mod]) -> List[Mod]:
+    def select_progression_mods(mod_list: List[Mod], load_order: List[str] = None) -> List[Mod]:
         try:
             logging.info("Selecting mods for patching...")
             logging.warn("Only mods with COMPATIBLE meta.lsx and Progressions.lsx file will be selected. Other mods don't need Progression patching.")
 
-            compatible_mods = mod_list
-            for mod in compatible_mods:
-                if mod.progressions is None:
-                    compatible_mods.remove(mod)
-            
+            # Merged values keep their first-seen order, so mods are merged in the game's load order
+            compatible_mods = ModManager.sort_by_load_order([mod for mod in mod_list if mod.progressions is not None], load_order)
+
             logging.info(f"Selected {len(compatible_mods)} mods for progression patching")
             for compatible_mod in compatible_mods:
                 logging.info(f"--{compatible_mod.name}")
@@ -113,24 +293,80 @@ class ModManager:
             logging.error(f"An error occurred while selecting patch compatible mods: {e}")
 
     @staticmethod
-    def combine_mods(mods: List[Mod]) -> Mod:
+    def combine_mods(mods: List[Mod], merge_state: MergeState = None, conflict_index: ConflictIndex = None) -> Mod:
         patch_data = Mod()
-        for mod in mods:
-            logging.debug(f"Combining progressions for {mod.name}...")
+        # Names aren't unique, so mods are told apart by the same keys the merge state uses
+        mod_keys = MergeState.mod_keys(mods)
+        if conflict_index is not None:
+            conflict_index.add_mod_names(mod_keys, [mod.name for mod in mods])
+        if merge_state is not None:
+            patch_data.progressions = ModManager.combine_mods_incrementally(mods, merge_state)
+            if conflict_index is not None:
+                # Unchanged progressions aren't re-merged, so every mod is recorded here
+                for mod_key, mod in zip(mod_keys, mods):
+                    conflict_index.add_all(mod_key, mod.progressions)
+        else:
+            progression_lists = []
+            for mod in mods:
+                logging.debug("Combining progressions for %s...", mod.name)
+                progression_lists.append(mod.progressions)
+            patch_data.progressions = ModManager.merge_progression_lists(progression_lists, conflict_index, mod_keys)
+
+        logging.info(f"Successfully combined progressions for {len(mods)} mods into {patch_data.name}")
+        return patch_data
 
-            for new_progression in mod.progressions:
-                existing_progression = next((p for p in patch_data.progressions if p.uuid == new_progression.uuid), None)
+    @staticmethod
+    def merge_progression_lists(progression_lists: List[List[Progression]], conflict_index: ConflictIndex = None,
+                                mod_keys: List[str] = None) -> List[Progression]:
+        # Indexed by UUID so every incoming progression is matched in constant time
+        progressions: Dict[str, Progression] = {}
+        subclass_uuids: Dict[str, Set[str]] = {}
+        for index, progression_list in enumerate(progression_lists):
+            profiler.count("progressions_merged", len(progression_list))
+            for new_progression in progression_list:
+                if conflict_index is not None:
+                    conflict_index.add(mod_keys[index] if mod_keys else str(index), new_progression)
+                existing_progression = progressions.get(new_progression.uuid)
                 if existing_progression:
-                    ModManager.merge_progressions(existing_progression, new_progression)
+                    ModManager.merge_progressions(existing_progression, new_progression, subclass_uuids[new_progression.uuid])
                 else:
-                    patch_data.progressions.append(new_progression)
+                    progressions[new_progression.uuid] = new_progression
+                    subclass_uuids[new_progression.uuid] = {s.uuid for s in new_progression.subclasses}
 
-            for patch_progression in patch_data.progressions:
-                ModManager.remove_value_duplicates(patch_progression)
-                ModManager.remove_duplicate_spellslots(patch_progression)
+        # Merged lists are only concatenated above, so duplicates are removed once at the end
+        merged_progressions = list(progressions.values())
+        for merged_progression in merged_progressions:
+            ModManager.remove_value_duplicates(merged_progression)
+            ModManager.remove_duplicate_action_resources(merged_progression)
+        return merged_progressions
 
-        logging.info(f"Successfully combined progressions for {len(mods)} mods into {patch_data.name}")
-        return patch_data
+    # Re-merges only the progressions touched by mods that changed since the last saved merge
+    @staticmethod
+    def combine_mods_incrementally(mods: List[Mod], merge_state: MergeState) -> List[Progression]:
+        mod_order = MergeState.mod_keys(mods)
+        mods_by_key = dict(zip(mod_order, mods))
+        fingerprints = {key: MergeState.fingerprint(mod) for key, mod in mods_by_key.items()}
+        changed_mods = merge_state.changed_mods(mod_order, fingerprints)
+        # Emit progressions in the same order a full merge would
+        merged_uuids = dict.fromkeys(p.uuid for mod in mods for p in mod.progressions)
+        affected = merge_state.affected_progressions(mod_order, mods_by_key, changed_mods) | {
+            uuid for uuid in merged_uuids if uuid not in merge_state.merged}
+
+        if affected or changed_mods or mod_order != merge_state.mod_order:
+            # Merging extends the first progression in place, so the mods' own progressions are copied
+            contributors: Dict[str, List[Progression]] = {uuid: [] for uuid in affected}
+            for mod in mods:
+                for progression in mod.progressions:
+                    if progression.uuid in contributors:
+                        contributors[progression.uuid].append(Progression.from_dict(progression.to_dict()))
+
+            for uuid, progressions in contributors.items():
+                merge_state.set_merged(uuid, ModManager.merge_progression_lists([progressions])[0] if progressions else None)
+            merge_state.update(mod_order, mods_by_key, fingerprints, changed_mods)
+            merge_state.save()
+        logging.info(f"Re-merged {len(affected)} of {len(merge_state.merged)} progressions")
+
+        return [merge_state.progression(uuid) for uuid in merged_uuids]
 
     @staticmethod
     def combine_icons(mods: List[Mod]) -> None:
@@ -138,39 +374,32 @@ class ModManager:
             if ModManager.ImprovedUI_Assets:
                 logging.warn(f"ImprovedUI Assets detected. Icons will be patched.")
                 logging.info("Combining icons...")
-                patch_class_icons_file = os.path.join(Paths.TEMP_DIR, "ImprovedUI Assets", "Public", "Game", "GUI", "Library", "IUI_ClassIcons.xaml")
+                patch_class_icons_file = "ImprovedUI Assets/Public/Game/GUI/Library/IUI_ClassIcons.xaml"
                 mod: Mod
-                for mod in mods:
-                    for mod_icon in mod.icons:
-                        # logging.debug(mod_icon.icon_string())
-                        # FileManager.insert_string_to_xml(patch_class_icons_file, "//DataTrigger[@Binding='{Binding SubclassIDString}']", mod_icon.icon_string(), namespace='default')
-                        FileManager.insert_string_to_xml(
-                            patch_class_icons_file,
-                            f"//DataTrigger[@Binding='{{Binding {mod_icon.icon_type}IDString}}']",
-                            mod_icon.icon_string(),
-                            namespace='default',
-                            position='first')
-                        FileManager.insert_string_to_xml(
-                            patch_class_icons_file,
-                            f"//DataTrigger[@Binding='{{Binding {mod_icon.icon_type}IDString}}']",
-                            mod_icon.icon_hotbar_string(),
-                            namespace='default',
-                            position='last')
+                with XmlEditSession(patch_class_icons_file, namespace='default', file_system=ModManager.file_system) as class_icons:
+                    for mod in mods:
+                        for mod_icon in mod.icons:
+                            data_triggers = f"//DataTrigger[@Binding='{{Binding {mod_icon.icon_type}IDString}}']"
+                            class_icons.insert(data_triggers, mod_icon.icon_string(), 'first', ModManager.data_trigger_key)
+                            class_icons.insert(data_triggers, mod_icon.icon_hotbar_string(), 'last', ModManager.data_trigger_key)
                 logging.info("Successfully combined icons")
         except Exception as e:
             logging.error(f"An error occurred while combining icons: {e}")
 
+    # Main and hotbar triggers share Binding and Value, so the icon source tells them apart
+    @staticmethod
+    def data_trigger_key(data_trigger: etree._Element) -> tuple:
+        return (data_trigger.get('Binding'), data_trigger.get('Value'), tuple(setter.get('Value') for setter in data_trigger))
+
     @staticmethod
     def create_patch_folder(patch_data: Mod, unpacked_mod_folders: List[str]) -> bool:
         try:
             logging.info("Creating patch files...")
 
-            meta_file_path = os.path.join(Paths.TEMP_DIR, patch_data.folder, "Mods", patch_data.folder, "meta.lsx")
-            progressions_file_path = os.path.join(Paths.TEMP_DIR, patch_data.folder, "Public", patch_data.folder, "Progressions", "Progressions.lsx")
-            FileManager.create_file(meta_file_path)
-            FileManager.create_file(progressions_file_path)
-            FileManager.write_file(meta_file_path, patch_data.meta_string())
-            FileManager.write_file(progressions_file_path, patch_data.progressions_string())
+            meta_file_path = f"{patch_data.folder}/Mods/{patch_data.folder}/meta.lsx"
+            progressions_file_path = f"{patch_data.folder}/Public/{patch_data.folder}/Progressions/Progressions.lsx"
+            ModManager.file_system.write_chunks(meta_file_path, [patch_data.meta_string()])
+            ModManager.file_system.write_chunks(progressions_file_path, patch_data.iter_progressions_strings())
 
             # if ModManager.ImprovedUI_Assets:
 
@@ -186,14 +415,58 @@ class ModManager:
         except Exception as e:
             logging.error(f"An error occurred while creating the patch files: {e}")
 
+    # Progressions.lsx is streamed into the buffer that becomes its .pak entry and handed over as a view, not a copy
+    @staticmethod
+    def patch_files(patch_data: Mod) -> Dict[str, Union[bytes, memoryview]]:
+        progressions_writer = io.TextIOWrapper(io.BytesIO(), encoding='utf-8', newline='')
+        patch_data.write_progressions(progressions_writer)
+        progressions_writer.flush()
+        progressions_buffer = progressions_writer.detach()
+        return {
+            f"Mods/{patch_data.folder}/meta.lsx": patch_data.meta_string().encode('utf-8'),
+            f"Public/{patch_data.folder}/Progressions/Progressions.lsx": progressions_buffer.getbuffer(),
+        }
+
+    # Hashes the generated patch files so unchanged patches can be detected between runs
+    @staticmethod
+    def patch_hash(files: Dict[str, Union[bytes, memoryview]]) -> str:
+        sha256 = hashlib.sha256()
+        for name, content in files.items():
+            sha256.update(name.encode('utf-8') + b'\0')
+            sha256.update(len(content).to_bytes(8, 'little'))
+            sha256.update(content)
+        return sha256.hexdigest()
+
+    @staticmethod
+    def load_patch_state() -> dict:
+        return FileManager.load_object_from_json(None, Paths.PATCH_STATE_FILE)
+
+    @staticmethod
+    def save_patch_state(patch_state: dict) -> None:
+        FileManager.create_folder(os.path.dirname(Paths.PATCH_STATE_FILE))
+        FileManager.save_object_to_json(patch_state, Paths.PATCH_STATE_FILE)
+
     @staticmethod
     def pack_patch(patch_data: Mod) -> bool:
         try:
             logging.info("Packing patch...")
-            source_path = os.path.join(Paths.TEMP_DIR, patch_data.folder)
             dest_path = os.path.join(Paths.MOD_LIST_DIR, patch_data.folder + ".pak")
-            LSLib.execute_command("create-package", source_path, dest_path)
+            with profiler.stage("patch_files"):
+                files = ModManager.patch_files(patch_data)
+            content_hash = ModManager.patch_hash(files)
+
+            patch_state = ModManager.load_patch_state()
+            if patch_state.get("pak_hash") == content_hash and patch_state.get("pak_fingerprint") == FileManager.file_fingerprint(dest_path):
+                logging.info("Patch is unchanged. Skipping packing...")
+                return True
+
+            with profiler.stage("write_package"):
+                LSPKWriter.write_package(dest_path, files)
+            patch_state["pak_hash"] = content_hash
+            patch_state["pak_fingerprint"] = FileManager.file_fingerprint(dest_path)
+            ModManager.save_patch_state(patch_state)
             logging.info("Patch packed successfully")
+            return True
         except Exception as e:
             logging.error(f"An error occurred while packing patch: {e}")
 
@@ -202,21 +475,43 @@ class ModManager:
         try:
             logging.info("Installing patch...")
             modsettings_file = FileManager.find_files(Paths.GAME_DATA_DIR, ["modsettings.lsx"])
-            FileManager.insert_string_to_xml(modsettings_file['modsettings.lsx'], "//node[@id='Module']", patch_data.module_string())
-            FileManager.insert_string_to_xml(modsettings_file['modsettings.lsx'], "//node[@id='ModuleShortDesc']", patch_data.module_short_desc_string())
+            modsettings_path = modsettings_file['modsettings.lsx']
+            module_string = patch_data.module_string()
+            module_short_desc_string = patch_data.module_short_desc_string()
+            # Only the module entries are written to modsettings.lsx, so only they decide whether it is up to date
+            content_hash = hashlib.sha256(f"{module_string}\0{module_short_desc_string}".encode('utf-8')).hexdigest()
+
+            patch_state = ModManager.load_patch_state()
+            if patch_state.get("installed_hash") == content_hash and patch_state.get("modsettings_fingerprint") == FileManager.file_fingerprint(modsettings_path):
+                logging.info("Patch is unchanged and already installed. Skipping modsettings.lsx update...")
+                return True
+
+            with XmlEditSession(modsettings_path) as modsettings:
+                uuid_key = XmlEditSession.attribute_key('UUID')
+                modsettings.upsert("//node[@id='Module']", module_string, uuid_key)
+                modsettings.upsert("//node[@id='ModuleShortDesc']", module_short_desc_string, uuid_key)
+            patch_state["installed_hash"] = content_hash
+            patch_state["modsettings_fingerprint"] = FileManager.file_fingerprint(modsettings_path)
+            ModManager.save_patch_state(patch_state)
             logging.info("Patch installed successfully")
             return True
         except Exception as e:
             logging.error(f"An error occurred while installing patch: {e}")
 
     @staticmethod
-    def merge_progressions(existing_progression: Progression, new_progression: Progression) -> None:
+    def merge_progressions(existing_progression: Progression, new_progression: Progression, subclass_uuids: Set[str] = None) -> None:
         try:
-            existing_subclass_uuids = [s.uuid for s in existing_progression.subclasses]
-            new_subclasses = [s for s in new_progression.subclasses if s.uuid not in existing_subclass_uuids]
-            existing_progression.subclasses.extend(new_subclasses)
+            if subclass_uuids is None:
+                subclass_uuids = {s.uuid for s in existing_progression.subclasses}
+            for subclass in new_progression.subclasses:
+                if subclass.uuid not in subclass_uuids:
+                    subclass_uuids.add(subclass.uuid)
+                    existing_progression.subclasses.append(subclass)
 
-            for attr in ['boosts', 'passives_added', 'passives_removed', 'selectors', 'allow_improvement', 'is_multiclass']:
+            for attr in ['boosts', 'passives_added', 'passives_removed', 'selectors']:
+                getattr(existing_progression, attr).extend(getattr(new_progression, attr))
+
+            for attr in ['allow_improvement', 'is_multiclass']:
                 existing_attr = getattr(existing_progression, attr, None)
                 new_attr = getattr(new_progression, attr, None)
                 setattr(existing_progression, attr, ModManager.merge_attributes(existing_attr, new_attr))
@@ -230,9 +525,9 @@ class ModManager:
                 return existing_progression or new_progression
 
             if isinstance(existing_progression, str) and isinstance(new_progression, str):
-                return ';'.join(set(existing_progression.split(';')).union(set(new_progression.split(';'))))
+                return ';'.join(dict.fromkeys(existing_progression.split(';') + new_progression.split(';')))
             elif isinstance(existing_progression, list) and isinstance(new_progression, list):
-                return list(set(existing_progression).union(set(new_progression)))
+                return list(dict.fromkeys(existing_progression + new_progression))
             else:
                 return existing_progression
         except Exception as e:
@@ -245,42 +540,39 @@ class ModManager:
             for attribute in attributes:
                 attr_value = getattr(progression, attribute, None)
                 if attr_value is not None:
-                    unique_values = list(set(attr_value))
+                    if attribute == "boosts":
+                        # Boosts that only differ in spacing are the same boost
+                        attr_value = [parse_boost(boost).canonical for boost in attr_value]
+                    # dict.fromkeys keeps the first occurrence, so values stay in mod load order
+                    unique_values = list(dict.fromkeys(attr_value))
                     setattr(progression, attribute, unique_values)
         except Exception as e:
             logging.error(f"An error occurred while removing value duplicates: {e}")
 
+    # Keeps the highest amount of every ActionResource (spell slots, rage, ki points...) per resource and level
     @staticmethod
-    def remove_duplicate_spellslots(progression: Progression) -> None:
+    def remove_duplicate_action_resources(progression: Progression) -> None:
         try:
             if progression.boosts is None:
                 return
 
-            highest_level_for_slot = {}
-
-            for boost in progression.boosts:
-                if "ActionResource(SpellSlot," in boost:
-                    parts = boost.split(",")
-                    level = int(parts[1])
-                    slots = int(parts[2].replace(")", ""))
-
-                    if level > highest_level_for_slot.get(slots, 0):
-                        highest_level_for_slot[slots] = level
+            # Boost text, or (resource, level) for ActionResource boosts -> boost kept in that place
+            new_boosts: Dict[Union[str, tuple], Boost] = {}
+            for boost in map(parse_boost, progression.boosts):
+                key = boost.action_resource_key or boost.canonical
+                kept_boost = new_boosts.get(key)
+                if kept_boost is None or (boost.amount is not None and boost.amount > kept_boost.amount):
+                    new_boosts[key] = boost
 
-            new_boosts = [boost for boost in progression.boosts if "ActionResource(SpellSlot," not in boost]
-
-            for slots, level in highest_level_for_slot.items():
-                new_boosts.append(f"ActionResource(SpellSlot,{level},{slots})")
-
-            progression.boosts = new_boosts
+            progression.boosts = [boost.canonical for boost in new_boosts.values()]
         except Exception as e:
-            logging.error(f"An error occurred while removing duplicate spellslots: {e}")
+            logging.error(f"An error occurred while removing duplicate action resources: {e}")
 
     @staticmethod
     def clean_up() -> None:
         try:
             logging.info("Cleaning temporary files...")
-            FileManager.clean_folder(Paths.TEMP_DIR)
+            ModManager.file_system.clear()
             logging.info("Temporary files cleaned successfully")
         except Exception as e:
             logging.error(f"An error occurred while cleaning up: {e}")
@@ -0,0 +1,93 @@
+import os
+import pickle
+import inspect
+import hashlib
+import logging
+from functools import lru_cache
+from typing import Dict, Optional
+from model.mod import Mod
+from model.progression import Progression
+from model.class_description import ClassDescription
+from model.subclass import SubClass
+from utils.file_manager import FileManager
+from utils.settings_manager import Paths
+
+
+# Classes whose module code decides what a parsed mod contains, any edit to those files invalidates the cache
+PARSER_CLASSES = (Mod, Progression, ClassDescription, SubClass, FileManager)
+
+
+class ModelCache:
+    # Bump when parsing changes outside of the PARSER_CLASSES modules, or when their source isn't shipped (frozen builds)
+    FORMAT = 1
+
+    def __init__(self, cache_file: str = None):
+        self.cache_file = cache_file or Paths.MODEL_CACHE_FILE
+        self.entries: Dict[str, dict] = {}
+        # Keys looked up this run, only these are written back so the cache doesn't grow forever
+        self.used_keys = set()
+        self.modified = False
+        try:
+            if os.path.exists(self.cache_file):
+                with open(self.cache_file, 'rb') as f:
+                    cache = pickle.load(f)
+                if cache.get("schema") == ModelCache.schema_version():
+                    self.entries = cache["entries"]
+                else:
+                    logging.info("Model cache was written by another version. Rebuilding it...")
+        except Exception as e:
+            logging.warning(f"Model cache {self.cache_file} is unreadable, rebuilding it: {e}")
+
+    # Changes whenever a model gains, loses or renames a field, or the code of a parser module changes
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def schema_version() -> str:
+        schema = (ModelCache.FORMAT, Mod.META_FIELDS, Progression.__slots__, ClassDescription.__slots__, SubClass.__slots__)
+        sha256 = hashlib.sha256(repr(schema).encode('utf-8'))
+        for parser_class in PARSER_CLASSES:
+            try:
+                with open(inspect.getfile(parser_class), 'rb') as f:
+                    sha256.update(f.read())
+            except (OSError, TypeError):
+                pass
+        return sha256.hexdigest()
+
+    # Identifies a mod by the contents of the files it is parsed from
+    @staticmethod
+    def key(files: Dict[str, bytes]) -> str:
+        sha256 = hashlib.sha256()
+        for file_name in Mod.MOD_FILES:
+            content = files.get(file_name, b'')
+            if isinstance(content, str):
+                content = content.encode('utf-8')
+            sha256.update(file_name.encode('utf-8') + b'\0')
+            sha256.update(len(content).to_bytes(8, 'little'))
+            sha256.update(content)
+        return sha256.hexdigest()
+
+    def get(self, key: str, unpacked_mod_folder: str = None) -> Optional[Mod]:
+        data = self.entries.get(key)
+        if data is None:
+            return None
+        self.used_keys.add(key)
+        return Mod.from_dict(data, unpacked_mod_folder)
+
+    def put(self, key: str, mod: Mod) -> None:
+        self.entries[key] = mod.to_dict()
+        self.used_keys.add(key)
+        self.modified = True
+
+    def save(self) -> None:
+        if not self.modified and self.used_keys == set(self.entries):
+            return
+        try:
+            FileManager.create_folder(os.path.dirname(self.cache_file))
+            entries = {key: self.entries[key] for key in self.used_keys}
+            temp_path = self.cache_file + ".tmp"
+            with open(temp_path, 'wb') as f:
+                pickle.dump({"schema": ModelCache.schema_version(), "entries": entries}, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, self.cache_file)
+            self.entries = entries
+            self.modified = False
+        except Exception as e:
+            logging.error(f"An error occurred while saving the model cache: {e}")
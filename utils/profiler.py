@@ -0,0 +1,153 @@
+import os
+import json
+import time
+import logging
+import threading
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Iterator, List, Optional
+
+
+class StageRecord:
+    __slots__ = ('calls', 'wall', 'cpu', 'child_wall', 'peak_memory')
+
+    def __init__(self):
+        self.calls = 0
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.child_wall = 0.0
+        self.peak_memory: Optional[int] = None
+
+
+class Profiler:
+    # Records wall time, CPU time and peak memory per nested stage, plus named counters
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.trace_memory = False
+        self.records: Dict[tuple, StageRecord] = {}
+        self.counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._main_thread = threading.main_thread()
+        self._main_stack: List[str] = []
+        # Peak memory seen by each open main thread stage, since tracemalloc only tracks one peak at a time
+        self._peaks: List[int] = []
+
+    def enable(self, trace_memory: bool = True) -> None:
+        self.enabled = True
+        self.trace_memory = trace_memory
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def disable(self) -> None:
+        self.enabled = False
+        if self.trace_memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self.trace_memory = False
+
+    def _stack(self) -> List[str]:
+        if threading.current_thread() is self._main_thread:
+            return self._main_stack
+        stack = getattr(self._local, 'stack', None)
+        if stack is None or len(stack) == self._local.base_depth:
+            # Outermost worker stages are nested under the main thread stage that started the pool
+            stack = self._local.stack = list(self._main_stack)
+            self._local.base_depth = len(stack)
+        return stack
+
+    def stage(self, name: str):
+        if not self.enabled:
+            return nullcontext()
+        return self._stage(name)
+
+    @contextmanager
+    def _stage(self, name: str) -> Iterator[None]:
+        on_main_thread = threading.current_thread() is self._main_thread
+        stack = self._stack()
+        stack.append(name)
+        path = tuple(stack)
+        trace_memory = on_main_thread and self.trace_memory and tracemalloc.is_tracing()
+        if trace_memory:
+            start_memory, peak_memory = tracemalloc.get_traced_memory()
+            if self._peaks:
+                self._peaks[-1] = max(self._peaks[-1], peak_memory)
+            self._peaks.append(start_memory)
+            tracemalloc.reset_peak()
+
+        # Main thread stages count the CPU time of the workers they wait for, worker stages only their own
+        cpu_clock = time.process_time if on_main_thread else time.thread_time
+        start_cpu = cpu_clock()
+        start_wall = time.perf_counter()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - start_wall
+            cpu = cpu_clock() - start_cpu
+            peak = None
+            if trace_memory:
+                stage_peak = max(self._peaks.pop(), tracemalloc.get_traced_memory()[1])
+                peak = stage_peak - start_memory
+                if self._peaks:
+                    self._peaks[-1] = max(self._peaks[-1], stage_peak)
+            stack.pop()
+
+            with self._lock:
+                record = self.records.get(path)
+                if record is None:
+                    record = self.records[path] = StageRecord()
+                record.calls += 1
+                record.wall += wall
+                record.cpu += cpu
+                if peak is not None:
+                    record.peak_memory = max(record.peak_memory or 0, peak)
+                # Parallel worker stages overlap, so only same-thread children count against self time
+                base_depth = 0 if on_main_thread else self._local.base_depth
+                if len(path) > base_depth + 1:
+                    parent = self.records.get(path[:-1])
+                    if parent is None:
+                        parent = self.records[path[:-1]] = StageRecord()
+                    parent.child_wall += wall
+
+    def count(self, counter: str, amount: int = 1) -> None:
+        if self.enabled:
+            with self._lock:
+                self.counters[counter] = self.counters.get(counter, 0) + amount
+
+    def report(self) -> dict:
+        with self._lock:
+            stages = [{
+                "stage": ';'.join(path),
+                "calls": record.calls,
+                "wall": round(record.wall, 6),
+                "self_wall": round(max(record.wall - record.child_wall, 0.0), 6),
+                "cpu": round(record.cpu, 6),
+                "peak_memory": record.peak_memory,
+            } for path, record in sorted(self.records.items())]
+            return {"stages": stages, "counters": dict(sorted(self.counters.items()))}
+
+    # Folded stacks with self time in microseconds, the input format of flamegraph.pl and speedscope
+    def folded_stacks(self) -> List[str]:
+        lines = []
+        with self._lock:
+            for path, record in self.records.items():
+                self_time = int(max(record.wall - record.child_wall, 0.0) * 1_000_000)
+                if self_time > 0:
+                    lines.append(f"{';'.join(path)} {self_time}")
+        return lines
+
+    # Writes the JSON report to report_path and the folded stacks next to it
+    def write_report(self, report_path: str) -> None:
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(report_path)), exist_ok=True)
+            with open(report_path, 'w') as f:
+                json.dump(self.report(), f, indent=2)
+            folded_path = os.path.splitext(report_path)[0] + ".folded"
+            with open(folded_path, 'w') as f:
+                f.write('\n'.join(self.folded_stacks()) + '\n')
+            logging.info(f"Profile written to {report_path} and {folded_path}")
+        except Exception as e:
+            logging.error(f"An error occurred while writing the profile report: {e}")
+
+
+# Disabled until main() is run with --profile, so instrumented code costs one attribute check
+profiler = Profiler()
@@ -11,7 +11,14 @@ class Paths:
     DIVINE_FILE = os.path.join(ROOT_DIR, "export_tool", "divine.exe")
     SETTINGS_FILE = os.path.join(ROOT_DIR, "settings.json")
     OUTPUT_DIR = os.path.join(ROOT_DIR, "output")
+    CONFLICT_REPORT_FILE = os.path.join(OUTPUT_DIR, "conflicts.json")
     TEMP_DIR = os.path.join(ROOT_DIR, "temp")
+    CACHE_DIR = os.path.join(ROOT_DIR, "cache")
+    EXTRACTION_CACHE_DIR = os.path.join(CACHE_DIR, "extraction")
+    PATCH_STATE_FILE = os.path.join(CACHE_DIR, "patch_state.json")
+    MERGE_STATE_FILE = os.path.join(CACHE_DIR, "merge_state.json")
+    MODEL_CACHE_FILE = os.path.join(CACHE_DIR, "models.pickle")
+    MOD_INDEX_FILE = os.path.join(CACHE_DIR, "mod_index.sqlite")
 
     # Enum paths
     ENGLISH_LOCALIZATION_DIR = os.path.join(ROOT_DIR, "EnglishLocalization")
@@ -0,0 +1,134 @@
+import os
+import time
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+from model.mod import Mod
+from utils.mod_manager import ModManager
+from utils.file_manager import FileManager
+from utils.extraction_cache import ExtractionCache
+from utils.merge_state import MergeState
+from utils.conflict_index import ConflictIndex
+from utils.model_cache import ModelCache
+from utils.mod_index import ModIndex
+from utils.settings_manager import Paths
+
+
+class ModWatcher:
+    # Keeps the parsed mods and merge state in memory and re-patches when the Mods folder or modsettings.lsx change
+    POLL_INTERVAL = 1.0
+    DEBOUNCE = 2.0
+    MODSETTINGS = "modsettings"
+
+    # The index is closed by whoever opened it, the watcher only updates it
+    def __init__(self, cache: ExtractionCache = None, poll_interval: float = None, debounce: float = None, *, index: ModIndex = None):
+        self.cache = cache or ExtractionCache()
+        self.index = index
+        self.poll_interval = poll_interval or ModWatcher.POLL_INTERVAL
+        self.debounce = debounce if debounce is not None else ModWatcher.DEBOUNCE
+        self.merge_state = MergeState()
+        self.model_cache = ModelCache()
+        # .pak file name -> (fingerprint it was read at, parsed mod or None if it isn't a patchable mod)
+        self.mods: Dict[str, Tuple[list, Optional[Mod]]] = {}
+        self.patch_data: Optional[Mod] = None
+        self.modsettings_path: Optional[str] = None
+        # Fingerprint of the modsettings.lsx the last update read the load order from
+        self.modsettings_fingerprint: Optional[list] = None
+        self._stop = threading.Event()
+
+    def find_modsettings(self) -> Optional[str]:
+        if self.modsettings_path is None or not os.path.exists(self.modsettings_path):
+            self.modsettings_path = FileManager.find_files(Paths.GAME_DATA_DIR, ["modsettings.lsx"]).get("modsettings.lsx")
+        return self.modsettings_path
+
+    # Fingerprints of every watched file; the patch's own .pak is left out by get_mod_list
+    def snapshot(self) -> Dict[str, list]:
+        snapshot = {mod: FileManager.file_fingerprint(os.path.join(Paths.MOD_LIST_DIR, mod)) for mod in ModManager.get_mod_list()}
+        modsettings_path = self.find_modsettings()
+        if modsettings_path is not None:
+            snapshot[ModWatcher.MODSETTINGS] = FileManager.file_fingerprint(modsettings_path)
+        return snapshot
+
+    # Re-reads only the mods whose .pak was added or changed since they were last read
+    def refresh_mods(self, snapshot: Dict[str, list]) -> List[str]:
+        changed_mods = [mod for mod, fingerprint in snapshot.items()
+                        if mod != ModWatcher.MODSETTINGS and self.mods.get(mod, (None,))[0] != fingerprint]
+        removed_mods = [mod for mod in self.mods if mod not in snapshot]
+        for mod in removed_mods:
+            del self.mods[mod]
+
+        for mod in changed_mods:
+            files = ModManager.read_mod(os.path.join(Paths.MOD_LIST_DIR, mod), self.cache)
+            loaded_mods = ModManager.load_mods({mod[:-4]: files}, self.model_cache) if files is not None else []
+            self.mods[mod] = (snapshot[mod], loaded_mods[0] if loaded_mods else None)
+        if changed_mods:
+            self.cache.save()
+            self.model_cache.save()
+        return changed_mods + removed_mods
+
+    def update_patch(self, snapshot: Dict[str, list]) -> None:
+        start = time.perf_counter()
+        changed_mods = self.refresh_mods(snapshot)
+        modsettings_changed = snapshot.get(ModWatcher.MODSETTINGS) != self.modsettings_fingerprint
+        self.modsettings_fingerprint = snapshot.get(ModWatcher.MODSETTINGS)
+        mods = [self.mods[mod][1] for mod in ModManager.get_mod_list() if mod in self.mods and self.mods[mod][1] is not None]
+        compatible_mods = None
+        if changed_mods or modsettings_changed or self.patch_data is None:
+            compatible_mods = ModManager.select_progression_mods(mods, ModManager.get_load_order(self.find_modsettings()))
+        # Mods are merged in load order, so a reordered modsettings.lsx changes the patch even if no .pak did
+        reordered = compatible_mods is not None and MergeState.mod_keys(compatible_mods) != self.merge_state.mod_order
+        if changed_mods or reordered or self.patch_data is None:
+            if changed_mods and self.patch_data is not None:
+                logging.info(f"Mods changed: {', '.join(changed_mods)}")
+            elif self.patch_data is not None:
+                logging.info("Load order changed")
+            if self.index is not None:
+                self.index.update(mods)
+            conflict_index = ConflictIndex()
+            self.patch_data = ModManager.combine_mods(compatible_mods, self.merge_state, conflict_index)
+            conflict_index.write_report()
+            ModManager.pack_patch(self.patch_data)
+        # Reinstalls when a mod manager rewrote modsettings.lsx without the patch, and is skipped otherwise
+        ModManager.install_patch(self.patch_data)
+        logging.info(f"Patch is up to date ({time.perf_counter() - start:.2f}s)")
+
+    # The snapshot an update worked from, with modsettings.lsx as the patch installed it. Mods that changed while
+    # the update ran still differ from it, and only the patcher's own modsettings.lsx write is folded in
+    def baseline(self, snapshot: Dict[str, list]) -> Dict[str, list]:
+        baseline = dict(snapshot)
+        installed_fingerprint = ModManager.load_patch_state().get("modsettings_fingerprint")
+        if ModWatcher.MODSETTINGS in baseline and installed_fingerprint is not None:
+            baseline[ModWatcher.MODSETTINGS] = installed_fingerprint
+        return baseline
+
+    def run(self) -> None:
+        logging.info(f"Watching {Paths.MOD_LIST_DIR} for changes. Press Ctrl+C to stop.")
+        snapshot = self.snapshot()
+        self.update_patch(snapshot)
+        known_snapshot = self.baseline(snapshot)
+        pending_since, pending_snapshot = None, None
+
+        try:
+            while not self._stop.wait(self.poll_interval):
+                snapshot = self.snapshot()
+                if snapshot == known_snapshot:
+                    pending_since = None
+                    continue
+                if pending_since is None or snapshot != pending_snapshot:
+                    # Wait until files stop changing, mod managers copy and rewrite in bursts
+                    pending_since, pending_snapshot = time.monotonic(), snapshot
+                    continue
+                if time.monotonic() - pending_since < self.debounce:
+                    continue
+
+                try:
+                    self.update_patch(snapshot)
+                except Exception as e:
+                    logging.error(f"An error occurred while updating the patch: {e}")
+                known_snapshot = self.baseline(snapshot)
+                pending_since = None
+        except KeyboardInterrupt:
+            logging.info("Stopped watching for changes")
+
+    def stop(self) -> None:
+        self._stop.set()
@@ -0,0 +1,138 @@
+import os
+import logging
+from functools import lru_cache
+from lxml import etree
+from typing import Callable, Dict, Hashable, List, Literal
+
+NodeKey = Callable[[etree._Element], Hashable]
+
+
+class XmlEditSession:
+    # Parses an XML file once, applies any number of edits and writes it back in a single atomic write
+    # With a file_system, xml_file_path is a path inside it instead of on disk
+    def __init__(self, xml_file_path: str, namespace: str = None, file_system=None):
+        self.xml_file_path = xml_file_path
+        self.namespace = namespace
+        self.file_system = file_system
+        if file_system is not None:
+            self.tree = etree.ElementTree(etree.fromstring(file_system.read(xml_file_path)))
+        else:
+            self.tree = etree.parse(xml_file_path)
+        self.root = self.tree.getroot()
+        self.nsmap = {namespace: self.root.nsmap[None]} if namespace else None
+        self.modified = False
+        # XPath expression -> matched nodes, in document order
+        self._nodes: Dict[str, List[etree._Element]] = {}
+        # XPath expression -> key function -> key -> node
+        self._indexes: Dict[str, Dict[NodeKey, Dict[Hashable, etree._Element]]] = {}
+
+    def __enter__(self) -> 'XmlEditSession':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            self.commit()
+
+    # Identifies a node by its tag, attributes and its children's tags and attributes
+    @staticmethod
+    def node_signature(node: etree._Element) -> Hashable:
+        return (
+            node.tag,
+            frozenset(node.attrib.items()),
+            tuple((child.tag, frozenset(child.attrib.items())) for child in node),
+        )
+
+    # Identifies a node by the value of one of its <attribute id="..."> children
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def attribute_key(attribute_id: str) -> NodeKey:
+        def key(node: etree._Element) -> Hashable:
+            for attribute in node.iterchildren('{*}attribute'):
+                if attribute.get('id') == attribute_id:
+                    return attribute.get('value')
+            return None
+        return key
+
+    def nodes(self, xpath_expr: str) -> List[etree._Element]:
+        if xpath_expr not in self._nodes:
+            resolved_expr = xpath_expr.replace('//', f"//{self.namespace}:") if self.namespace else xpath_expr
+            self._nodes[xpath_expr] = self.root.xpath(resolved_expr, namespaces=self.nsmap)
+        return self._nodes[xpath_expr]
+
+    def _index(self, xpath_expr: str, key: NodeKey) -> Dict[Hashable, etree._Element]:
+        indexes = self._indexes.setdefault(xpath_expr, {})
+        if key not in indexes:
+            indexes[key] = {key(node): node for node in reversed(self.nodes(xpath_expr))}
+        return indexes[key]
+
+    def _parse(self, string_to_insert: str) -> etree._Element:
+        if not self.namespace:
+            return etree.fromstring(string_to_insert)
+        # Parse inside a wrapper so the new nodes belong to the document's default namespace
+        wrapper = etree.fromstring(f'<wrapper xmlns="{self.root.nsmap[None]}">{string_to_insert}</wrapper>')
+        return wrapper[0]
+
+    def insert(self, xpath_expr: str, string_to_insert: str, position: Literal['first', 'last'] = 'last', key: NodeKey = None) -> str:
+        nodes = self.nodes(xpath_expr)
+        if not nodes:
+            return "No node found"
+
+        new_element = self._parse(string_to_insert)
+        key = key or XmlEditSession.node_signature
+        if key(new_element) in self._index(xpath_expr, key):
+            return "Element already exists"
+
+        target_index = 0 if position == 'first' else len(nodes) - 1
+        target_node = nodes[target_index]
+        parent = target_node.getparent()
+        parent.insert(parent.index(target_node) + 1, new_element)
+
+        # New nodes are assumed to match the expression they were inserted against
+        nodes.insert(target_index + 1, new_element)
+        for index_key, index in self._indexes.get(xpath_expr, {}).items():
+            index.setdefault(index_key(new_element), new_element)
+        self.modified = True
+        return "Element inserted"
+
+    # Replaces the node with the same key as the new node, or inserts it if there is none
+    def upsert(self, xpath_expr: str, string_to_insert: str, key: NodeKey, position: Literal['first', 'last'] = 'last') -> str:
+        nodes = self.nodes(xpath_expr)
+        if not nodes:
+            return "No node found"
+
+        new_element = self._parse(string_to_insert)
+        new_key = key(new_element)
+        existing_node = self._index(xpath_expr, key).get(new_key) if new_key is not None else None
+        if existing_node is None:
+            return self.insert(xpath_expr, string_to_insert, position, key)
+        if XmlEditSession.node_signature(existing_node) == XmlEditSession.node_signature(new_element):
+            return "Element already exists"
+
+        new_element.tail = existing_node.tail
+        existing_node.getparent().replace(existing_node, new_element)
+        nodes[nodes.index(existing_node)] = new_element
+        for index_key, index in self._indexes[xpath_expr].items():
+            if index.get(index_key(existing_node)) is existing_node:
+                del index[index_key(existing_node)]
+            index.setdefault(index_key(new_element), new_element)
+        self.modified = True
+        return "Element updated"
+
+    def commit(self) -> bool:
+        if not self.modified:
+            return False
+        if self.file_system is not None:
+            self.file_system.write(self.xml_file_path, etree.tostring(self.tree, pretty_print=True, xml_declaration=True, encoding="UTF-8"))
+            self.modified = False
+            return True
+        temp_path = self.xml_file_path + ".tmp"
+        try:
+            self.tree.write(temp_path, pretty_print=True, xml_declaration=True, encoding="UTF-8")
+            os.replace(temp_path, self.xml_file_path)
+            self.modified = False
+            return True
+        except Exception as e:
+            logging.error(f"An error occurred while saving {self.xml_file_path}: {e}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise